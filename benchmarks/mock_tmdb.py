@@ -0,0 +1,137 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import synthetic_data
+
+# Servidor local que imita os endpoints do TMDB usados pelo pipeline Bronze.
+# Permite medir a ingestão sem depender da API real, simulando latência e limite de requisições (429).
+#
+# Uso isolado:
+#   python benchmarks/mock_tmdb.py --shows 1000 --latency 0.05 --rate-limit 40
+#   TMDB_API_BASE_URL=http://127.0.0.1:8765 TMDB_API_KEY=mock TMDB_REQUEST_DELAY=0 python src/pipelines/bronze.py
+
+RESULTS_PER_PAGE = 20
+
+
+class MockTMDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, n_shows, latency=0.0, jitter=0.0, rate_limit=None, seed=42):
+        super().__init__(address, _MockTMDBHandler)
+        self.n_shows = n_shows
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit # Máximo de requisições por segundo (None = sem limite)
+        self.people_pool_size = max(500, n_shows * 2)
+        self.rng = random.Random(seed)
+        self.stats = {'requests': 0, 'rate_limited': 0}
+        self._window = []
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_rate_limit(self):
+        """Janela deslizante de 1 segundo: retorna True se a requisição excede o limite."""
+        with self._lock:
+            self.stats['requests'] += 1
+            if not self.rate_limit:
+                return False
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                self.stats['rate_limited'] += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def simulated_latency(self):
+        with self._lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+
+class _MockTMDBHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass # Silencioso: o volume de requisições poluiria a saída do benchmark
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _show_exists(self, show_id):
+        first = synthetic_data.FIRST_SHOW_ID
+        return first <= show_id < first + self.server.n_shows
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        path = parsed.path.rstrip('/')
+
+        time.sleep(self.server.simulated_latency())
+        if not params.get('api_key'):
+            return self._send_json(401, {"status_code": 7, "status_message": "Invalid API key"})
+        if self.server.should_rate_limit():
+            return self._send_json(429, {"status_code": 25, "status_message": "Request limit exceeded"},
+                                   headers={"Retry-After": "1"})
+
+        if path == "/genre/tv/list":
+            return self._send_json(200, {"genres": [{"id": synthetic_data.DRAMA_GENRE_ID, "name": "드라마"}] +
+                                         [{"id": g, "name": n} for g, n in synthetic_data.GENRES[1:]]})
+
+        if path == "/discover/tv":
+            page = int(params.get('page', 1))
+            total_pages = min(500, (self.server.n_shows + RESULTS_PER_PAGE - 1) // RESULTS_PER_PAGE)
+            start = (page - 1) * RESULTS_PER_PAGE
+            end = min(start + RESULTS_PER_PAGE, self.server.n_shows)
+            results = [synthetic_data.make_discover_info(synthetic_data.show_id_for_index(i)) for i in range(start, end)]
+            return self._send_json(200, {"page": page, "results": results,
+                                         "total_pages": total_pages, "total_results": self.server.n_shows})
+
+        match = re.fullmatch(r"/tv/(\d+)(/credits)?", path)
+        if match and self._show_exists(int(match.group(1))):
+            show_id = int(match.group(1))
+            if match.group(2):
+                return self._send_json(200, synthetic_data.make_credits(show_id, self.server.people_pool_size))
+            return self._send_json(200, synthetic_data.make_details(show_id))
+
+        return self._send_json(404, {"status_code": 34, "status_message": "The resource you requested could not be found."})
+
+
+def start_mock_server(n_shows, latency=0.0, jitter=0.0, rate_limit=None, host="127.0.0.1", port=0):
+    """Sobe o servidor em uma thread daemon e o retorna (use server.base_url e server.shutdown())."""
+    server = MockTMDBServer((host, port), n_shows, latency=latency, jitter=jitter, rate_limit=rate_limit)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servidor TMDB local para benchmarks.")
+    parser.add_argument("--shows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada por requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requisições por segundo antes de responder 429")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = MockTMDBServer(("127.0.0.1", args.port), args.shows, args.latency, args.jitter, args.rate_limit)
+    print(f"Mock TMDB em {server.base_url} ({args.shows} Kdramas). Ctrl+C para sair.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,371 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import synthetic_data
+from mock_tmdb import start_mock_server
+
+# Suíte de benchmarks offline do pipeline (não acessa a API real do TMDB).
+#   - bronze: throughput da ingestão contra o servidor TMDB local, com latência e limite de requisições simulados
+#   - silver/gold: tempo total e pico de memória sobre datasets Bronze sintéticos em várias escalas
+#   - dashboard: latência das consultas do dashboard (kdrama_dashboard/queries.py) sobre a tabela Gold
+#   - startup: tempo de import de cada estágio (python -X importtime) contra um orçamento fixo
+#
+# Os estágios rodam em subprocessos (como na DAG), e os números vêm dos relatórios de métricas
+# (common/metrics.py) que cada estágio grava. Os resultados são comparados com o baseline salvo
+# em benchmarks/baselines/baseline.json; uma regressão acima da tolerância encerra com código 1.
+#
+# Exemplos (da raiz do projeto):
+#   python benchmarks/run_benchmarks.py                       # escalas 1k e 10k
+#   python benchmarks/run_benchmarks.py --scales 1k,10k,100k  # 100k gera ~2 GB de JSON temporário
+#   python benchmarks/run_benchmarks.py --save-baseline       # grava o baseline atual
+#   python benchmarks/run_benchmarks.py --require-baseline    # CI: sem baseline também é falha
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+DASHBOARD_DIR = os.path.join(PROJECT_ROOT, "kdrama_dashboard")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+DASHBOARD_TABLE = "kdramas_finais_para_dashboard.parquet"
+
+# Orçamento de startup (ms de import do módulo do estágio, medido com -X importtime).
+# Os estágios rodam em 3 interpretadores separados por execução da DAG, então o import deve ser leve:
+# bibliotecas pesadas só podem ser carregadas dentro das funções que as usam.
+STARTUP_BUDGET_MS = {'bronze': 100, 'silver': 100, 'gold': 100}
+SEARCH_QUERIES = {'palavra': "amor", 'prefixo': "pous", 'com_erro': "promesa", 'hangul': "사랑", 'frase': "amor proibido"}
+# Variação absoluta mínima para contar como regressão (abaixo disso é ruído de medição: 0,3 ms a mais
+# no p95 de uma consulta de poucos ms passa da tolerância relativa sem significar nada)
+MIN_REGRESSION_DELTA = {'_ms': 5.0, '_seconds': 1.0}
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'scipy', 'requests', 'dotenv', 'prometheus_client', 'psutil')
+
+
+def _stage_env(data_dir, extra=None):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = SRC_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    env['KDRAMA_DATA_DIR'] = data_dir
+    env['KDRAMA_METRICS_DIR'] = os.path.join(data_dir, "metrics")
+    env.update(extra or {})
+    return env
+
+
+def run_stage(stage, data_dir, extra_env=None):
+    """Executa src/pipelines/<stage>.py em um subprocesso e retorna (tempo total, relatório de métricas)."""
+    script = os.path.join(SRC_DIR, "pipelines", f"{stage}.py")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, script], cwd=PROJECT_ROOT, env=_stage_env(data_dir, extra_env),
+        capture_output=True, text=True
+    )
+    wall_seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Estágio {stage} falhou (código {completed.returncode}):\n{completed.stderr[-4000:]}")
+
+    report_path = os.path.join(data_dir, "metrics", f"{stage}_run_report.json")
+    with open(report_path, 'r', encoding='utf-8') as f:
+        return wall_seconds, json.load(f)
+
+
+def bench_bronze(work_dir, n_shows, latency, jitter, rate_limit):
+    server = start_mock_server(n_shows, latency=latency, jitter=jitter, rate_limit=rate_limit)
+    try:
+        pages = (n_shows + 19) // 20
+        wall_seconds, report = run_stage("bronze", work_dir, {
+            'TMDB_API_BASE_URL': server.base_url,
+            'TMDB_API_KEY': "benchmark",
+            'TMDB_REQUEST_DELAY': "0",
+            'KDRAMA_MAX_DISCOVER_PAGES': str(pages),
+        })
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    retries_429 = sum(reasons.get('429', 0) for reasons in report['retries'].values())
+    return {
+        'shows': n_shows,
+        'wall_seconds': round(wall_seconds, 3),
+        'kdramas_per_second': report['records_per_second'].get('kdramas'),
+        'requests': sum(r['count'] for r in report['requests'].values()),
+        'retries_429': retries_429,
+        'mock_rate_limited': server.stats['rate_limited'],
+        'bytes_downloaded': report['bytes_downloaded'],
+        'write_seconds': report['phases_seconds'].get('write'), # Na thread de gravação (write-behind)
+        'write_enqueue_seconds': report['phases_seconds'].get('write_enqueue'), # Bloqueado no laço de busca
+        'peak_rss_bytes': report['peak_rss_bytes'],
+    }
+
+
+def bench_silver_gold(work_dir, n_shows):
+    store_path = os.path.join(work_dir, "bronze", "store")
+    start = time.perf_counter()
+    synthetic_data.write_bronze_dataset(store_path, n_shows)
+    generation_seconds = time.perf_counter() - start
+
+    results = {'shows': n_shows, 'dataset_generation_seconds': round(generation_seconds, 3)}
+    for stage in ("silver", "gold"):
+        wall_seconds, report = run_stage(stage, work_dir)
+        results[stage] = {
+            'wall_seconds': round(wall_seconds, 3),
+            'stage_seconds': report['elapsed_seconds'],
+            'phases_seconds': report['phases_seconds'],
+            'peak_rss_bytes': report['peak_rss_bytes'],
+        }
+
+    # Segunda execução do Silver sem mudanças no Bronze: mede o caminho incremental (hashes inalterados)
+    wall_seconds, report = run_stage("silver", work_dir)
+    results['silver_incremental'] = {'wall_seconds': round(wall_seconds, 3), 'stage_seconds': report['elapsed_seconds']}
+    return results
+
+
+def _parse_importtime(stderr):
+    """Retorna {módulo: tempo cumulativo em us} a partir da saída de -X importtime."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def bench_startup(repeats=5):
+    """Mede o import de cada estágio (melhor de N execuções) e verifica o orçamento e os imports pesados."""
+    results, violations = {}, []
+    for stage, budget_ms in STARTUP_BUDGET_MS.items():
+        module = f"pipelines.{stage}"
+        import_times, heavy = [], set()
+        for _ in range(repeats):
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                cwd=PROJECT_ROOT, env=_stage_env(tempfile.gettempdir()), capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"Falha ao importar {module}:\n{completed.stderr[-4000:]}")
+            cumulative = _parse_importtime(completed.stderr)
+            import_times.append(cumulative[module] / 1000)
+            heavy.update(name for name in cumulative if name.split(".")[0] in HEAVY_MODULES)
+
+        import_ms = round(min(import_times), 3)
+        results[stage] = {'import_ms': import_ms, 'budget_ms': budget_ms, 'heavy_imports': sorted(heavy)}
+        if import_ms > budget_ms:
+            violations.append(f"{module}: import de {import_ms} ms excede o orçamento de {budget_ms} ms")
+        if heavy:
+            violations.append(f"{module}: importa módulos pesados no startup ({', '.join(sorted(heavy))})")
+    return results, violations
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_dashboard(gold_dir, repeats):
+    import pandas as pd
+    sys.path.insert(0, DASHBOARD_DIR)
+    import queries
+    from common import search_index, aggregate_cube, schema
+
+    df = schema.read_parquet(os.path.join(gold_dir, DASHBOARD_TABLE), schema.GOLD_DASHBOARD_SCHEMA)
+    # A view dbo.KdramaDashboard expõe a nota como 'vote_average'
+    df = df.rename(columns={'vote_average_details': 'vote_average'})
+    # Memória do DataFrame que o dashboard mantém em cache (schema compacto: categorias, Int16/Int32, float32)
+    results = {'memoria_df_bytes': int(df.memory_usage(deep=True).sum())}
+    min_year, max_year = int(df['release_year'].min()), int(df['release_year'].max())
+    genres = queries.get_all_genres(df)
+
+    scenarios = {
+        'todos': ((min_year, max_year), []),
+        'intervalo_anos': ((max_year - 1, max_year), []),
+        'um_genero': ((min_year, max_year), genres[:1]),
+        'tres_generos': ((min_year, max_year), genres[:3]),
+    }
+    for name, (year_range, selected_genres) in scenarios.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            df_filtered = queries.filter_kdramas(df, year_range, selected_genres)
+            queries.compute_kpis(df_filtered)
+            queries.top_kdramas_by_popularity(df_filtered, n=10)
+            queries.kdramas_per_year(df_filtered)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {'p50_ms': round(_percentile(timings, 0.5), 3), 'p95_ms': round(_percentile(timings, 0.95), 3)}
+
+    start = time.perf_counter()
+    queries.get_all_genres(df)
+    results['lista_generos_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    # Os mesmos cenários respondidos pelo cubo de agregados do Gold (KPIs, top 10 e contagem por ano)
+    indexed_cube = aggregate_cube.index_cube(pd.read_parquet(os.path.join(gold_dir, aggregate_cube.CUBE_FILENAME)))
+    if not aggregate_cube.cube_matches(indexed_cube, df):
+        raise RuntimeError("Cubo de agregados não corresponde à tabela do dashboard.")
+    df_by_id = queries.index_by_id(df) # Como no dashboard (load_data_by_id)
+    for name, (year_range, selected_genres) in scenarios.items():
+        if len(selected_genres) > 1:
+            continue # Vários gêneros: o cubo não responde (o dashboard varre os dados)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            answer = aggregate_cube.query_cube(indexed_cube, year_range, selected_genres)
+            queries.summarize_from_cube(df_by_id, answer, n=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[f'cubo_{name}'] = {'p50_ms': round(_percentile(timings, 0.5), 3), 'p95_ms': round(_percentile(timings, 0.95), 3)}
+
+    # Busca textual pelo índice invertido gerado no Gold (consultas exatas, parciais, com erro e em Hangul)
+    index_path = os.path.join(gold_dir, search_index.SEARCH_INDEX_FILENAME)
+    start = time.perf_counter()
+    index = search_index.SearchIndex.load(index_path)
+    results['busca_carga_indice_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    results['busca_indice_bytes'] = os.path.getsize(index_path)
+    for name, query in SEARCH_QUERIES.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            queries.search_results(df, index.search(query, limit=50))
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[f'busca_{name}'] = {'p50_ms': round(_percentile(timings, 0.5), 3), 'p95_ms': round(_percentile(timings, 0.95), 3)}
+    return results
+
+
+def _flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compara métricas numéricas com o baseline.
+    Tempos/memória ('_seconds', '_ms', '_bytes') pioram quando sobem; throughput ('_per_second') quando desce.
+    Tempos só contam como regressão se também subirem mais que MIN_REGRESSION_DELTA.
+    """
+    regressions = []
+    current, previous = _flatten(results['benchmarks']), _flatten(baseline['benchmarks'])
+    for key, value in current.items():
+        old_value = previous.get(key)
+        if not old_value:
+            continue
+        if key.endswith('_per_second'):
+            if value < old_value * (1 - tolerance):
+                regressions.append((key, old_value, value))
+        elif key.endswith(('_seconds', '_ms', '_bytes')) and 'generation' not in key:
+            min_delta = next((delta for suffix, delta in MIN_REGRESSION_DELTA.items() if key.endswith(suffix)), 0)
+            if value > old_value * (1 + tolerance) and value - old_value > min_delta:
+                regressions.append((key, old_value, value))
+    return regressions
+
+
+def _save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do pipeline de Kdramas.")
+    parser.add_argument("--scales", default="1k,10k", help=f"Escalas para silver/gold ({', '.join(synthetic_data.SCALES)})")
+    parser.add_argument("--bronze-shows", type=int, default=200, help="Kdramas servidos pelo mock no benchmark Bronze")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada da API (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    # O laço Bronze é sequencial: com 50 ms de latência faz ~20 req/s, então o limite padrão precisa ficar abaixo disso
+    parser.add_argument("--rate-limit", type=int, default=10,
+                        help="Requisições/s antes de o mock responder 429 (0 = sem limite)")
+    parser.add_argument("--dashboard-repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Piora relativa aceita antes de acusar regressão")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novo baseline")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Falha (código 1) se não houver baseline para comparar (uso em CI)")
+    parser.add_argument("--keep-data", action="store_true", help="Não apaga os dados temporários gerados")
+    parser.add_argument("--startup-only", action="store_true", help="Executa apenas a verificação de startup")
+    args = parser.parse_args()
+
+    work_root = tempfile.mkdtemp(prefix="kdrama_bench_")
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+        },
+        'params': vars(args),
+        'benchmarks': {},
+    }
+    print("[startup] python -X importtime para cada estágio...")
+    results['benchmarks']['startup'], startup_violations = bench_startup()
+    print(f"  {results['benchmarks']['startup']}")
+    for violation in startup_violations:
+        print(f"  ORÇAMENTO DE STARTUP VIOLADO: {violation}")
+    if args.startup_only:
+        return 1 if startup_violations else 0
+
+    try:
+        print(f"[bronze] {args.bronze_shows} Kdramas, latência {args.latency}s, limite {args.rate_limit} req/s...")
+        results['benchmarks']['bronze'] = bench_bronze(
+            os.path.join(work_root, "bronze_run"), args.bronze_shows, args.latency, args.jitter, args.rate_limit
+        )
+        print(f"  {results['benchmarks']['bronze']}")
+        # Com limite configurado, o caminho 429/Retry-After precisa ter sido exercitado
+        rate_limit_unexercised = bool(args.rate_limit) and results['benchmarks']['bronze']['mock_rate_limited'] == 0
+        if rate_limit_unexercised:
+            print(f"  LIMITE DE REQUISIÇÕES NÃO EXERCITADO: nenhum 429 com limite de {args.rate_limit} req/s "
+                  f"(use um --rate-limit menor que o throughput alcançado)")
+
+        for scale in [s.strip() for s in args.scales.split(",") if s.strip()]:
+            n_shows = synthetic_data.SCALES.get(scale) or int(scale)
+            scale_dir = os.path.join(work_root, f"scale_{scale}")
+            print(f"[silver/gold] escala {scale} ({n_shows} Kdramas)...")
+            scale_results = bench_silver_gold(scale_dir, n_shows)
+            print(f"[dashboard] escala {scale}...")
+            scale_results['dashboard'] = bench_dashboard(os.path.join(scale_dir, "gold"), args.dashboard_repeats)
+            results['benchmarks'][f"scale_{scale}"] = scale_results
+            print(f"  {scale_results}")
+            if not args.keep_data:
+                shutil.rmtree(scale_dir, ignore_errors=True)
+    finally:
+        if args.keep_data:
+            print(f"Dados temporários mantidos em: {work_root}")
+        else:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    _save_json(results, os.path.join(RESULTS_DIR, "latest.json"))
+    _save_json(results, os.path.join(RESULTS_DIR, f"run_{datetime.now():%Y%m%d_%H%M%S}.json"))
+
+    if startup_violations or rate_limit_unexercised:
+        return 1
+
+    if args.save_baseline:
+        _save_json(results, BASELINE_PATH)
+        print(f"Baseline salvo em: {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("Nenhum baseline encontrado. Rode com --save-baseline para criar um.")
+        return 1 if args.require_baseline else 0
+
+    with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressão(ões) acima de {args.tolerance:.0%} em relação ao baseline:")
+        for key, old_value, new_value in regressions:
+            print(f"  {key}: {old_value} -> {new_value}")
+        return 1
+    print("Nenhuma regressão em relação ao baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
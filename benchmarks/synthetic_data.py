@@ -0,0 +1,204 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from common import bronze_store
+
+# Gerador de payloads sintéticos no formato da API do TMDB (discover, details e credits).
+# Os payloads são determinísticos (mesmo seed -> mesmos dados) e têm tamanhos próximos dos reais
+# (~1 KB para discover, ~3-6 KB para details com keywords/providers e ~10-30 KB para credits).
+# Usado tanto pelo servidor TMDB local (mock_tmdb.py) quanto para montar datasets Bronze offline.
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+FIRST_SHOW_ID = 100000
+DRAMA_GENRE_ID = 18
+
+GENRES = [
+    (18, "Drama"), (35, "Comédia"), (9648, "Mistério"), (80, "Crime"), (10751, "Família"),
+    (10759, "Action & Adventure"), (10765, "Sci-Fi & Fantasy"), (10768, "War & Politics"),
+    (10766, "Soap"), (10764, "Reality"),
+]
+NETWORKS = [
+    (866, "tvN"), (885, "JTBC"), (342, "KBS2"), (97, "MBC"), (156, "SBS"), (213, "Netflix"),
+    (4090, "ENA"), (2739, "Disney+"), (3546, "TVING"), (5678, "Coupang Play"),
+]
+PROVIDERS = [(8, "Netflix"), (337, "Disney Plus"), (119, "Amazon Prime Video"), (1796, "Viki"), (307, "Globoplay")]
+STATUSES = ["Ended", "Returning Series", "Ended", "Ended", "Canceled", "In Production"]
+KEYWORDS = [
+    "romance", "amor proibido", "viagem no tempo", "vingança", "escritório", "médico", "advogado",
+    "chaebol", "dinastia joseon", "zumbi", "thriller psicológico", "comédia romântica", "amizade",
+    "escola", "família", "webtoon", "baseado em romance", "policial", "fantasia", "idol",
+    "sobrenatural", "segundo casamento", "contrato de casamento", "serial killer", "política",
+]
+TITLE_WORDS_PT = [
+    "Amor", "Destino", "Segredo", "Coração", "Pousando", "Sonho", "Rainha", "Rei", "Lua", "Sol",
+    "Verão", "Inverno", "Memórias", "Caminho", "Promessa", "Jardim", "Estrela", "Noite", "Mar", "Céu",
+]
+TITLE_WORDS_KO = [
+    "사랑", "운명", "비밀", "마음", "꿈", "여왕", "왕", "달", "해", "여름", "겨울", "기억", "길",
+    "약속", "정원", "별", "밤", "바다", "하늘", "봄",
+]
+SURNAMES = ["Kim", "Lee", "Park", "Choi", "Jung", "Kang", "Cho", "Yoon", "Jang", "Lim", "Han", "Shin", "Seo", "Kwon"]
+GIVEN_SYLLABLES = [
+    "Min", "Ji", "Soo", "Hyun", "Woo", "Jin", "Seo", "Hye", "Young", "Joon", "Ho", "Eun", "Ha", "Yeon",
+    "Sung", "Jae", "Na", "Ra", "Bin", "Kyung",
+]
+CREW_JOBS = [
+    ("Directing", "Director"), ("Writing", "Writer"), ("Writing", "Screenplay"), ("Production", "Producer"),
+    ("Production", "Executive Producer"), ("Sound", "Original Music Composer"), ("Camera", "Director of Photography"),
+    ("Editing", "Editor"), ("Art", "Production Design"), ("Costume & Make-Up", "Costume Design"),
+]
+LOREM = (
+    "Uma história envolvente sobre encontros inesperados, segredos de família e escolhas difíceis "
+    "que mudam o destino de todos ao redor. Entre risos e lágrimas, os protagonistas descobrem o "
+    "verdadeiro significado de amor, amizade e coragem em meio a conflitos e reviravoltas."
+).split()
+
+
+def show_id_for_index(index):
+    return FIRST_SHOW_ID + index
+
+
+def _rng(show_id, salt):
+    return random.Random(show_id * 31 + salt)
+
+
+def _person_name(rng):
+    return f"{rng.choice(SURNAMES)} {rng.choice(GIVEN_SYLLABLES)}-{rng.choice(GIVEN_SYLLABLES).lower()}"
+
+
+def _text(rng, min_words, max_words):
+    return " ".join(rng.choice(LOREM) for _ in range(rng.randint(min_words, max_words))).capitalize() + "."
+
+
+def _image_path(rng):
+    return "/" + "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJ0123456789") for _ in range(27)) + ".jpg"
+
+
+def make_discover_info(show_id):
+    """Payload de um item de /discover/tv."""
+    rng = _rng(show_id, 1)
+    year = rng.randint(2020, 2025)
+    title_pt = " ".join(rng.sample(TITLE_WORDS_PT, rng.randint(1, 3)))
+    title_ko = " ".join(rng.sample(TITLE_WORDS_KO, rng.randint(1, 2)))
+    return {
+        "adult": False,
+        "backdrop_path": _image_path(rng),
+        "genre_ids": [DRAMA_GENRE_ID] + [g[0] for g in rng.sample(GENRES[1:], rng.randint(0, 2))],
+        "id": show_id,
+        "origin_country": ["KR"],
+        "original_language": "ko",
+        "original_name": title_ko,
+        "overview": _text(rng, 25, 80),
+        "popularity": round(rng.lognormvariate(3, 1), 3),
+        "poster_path": _image_path(rng),
+        "first_air_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "name": f"{title_pt} ({show_id})",
+        "vote_average": round(rng.uniform(5, 9.5), 3),
+        "vote_count": rng.randint(0, 3000),
+    }
+
+
+def make_details(show_id):
+    """Payload de /tv/{id} com append_to_response=keywords,watch/providers."""
+    rng = _rng(show_id, 2)
+    discover = make_discover_info(show_id)
+    genres = [{"id": g, "name": n} for g, n in GENRES if g in discover["genre_ids"]]
+    networks = [{"id": i, "name": n, "logo_path": _image_path(rng), "origin_country": "KR"}
+                for i, n in rng.sample(NETWORKS, rng.randint(1, 2))]
+    providers = [{"logo_path": _image_path(rng), "provider_id": i, "provider_name": n, "display_priority": p}
+                 for p, (i, n) in enumerate(rng.sample(PROVIDERS, rng.randint(0, 2)))]
+    number_of_episodes = rng.choice([12, 16, 16, 20, 24, 32, 50, 100])
+    seasons = [{
+        "air_date": discover["first_air_date"], "episode_count": number_of_episodes, "id": show_id * 10 + s,
+        "name": f"Temporada {s}", "overview": _text(rng, 5, 30), "poster_path": _image_path(rng),
+        "season_number": s, "vote_average": round(rng.uniform(5, 9), 1),
+    } for s in range(1, rng.randint(1, 3) + 1)]
+    return {
+        "adult": False,
+        "backdrop_path": discover["backdrop_path"],
+        "created_by": [{"id": rng.randint(1, 10 ** 6), "name": _person_name(rng), "gender": rng.randint(0, 2),
+                        "profile_path": _image_path(rng)} for _ in range(rng.randint(0, 2))],
+        "episode_run_time": rng.choice([[], [60], [70], [60, 70], [45]]),
+        "first_air_date": discover["first_air_date"],
+        "genres": genres,
+        "homepage": f"https://example.org/kdrama/{show_id}",
+        "id": show_id,
+        "in_production": rng.random() < 0.1,
+        "languages": ["ko"],
+        "last_air_date": discover["first_air_date"],
+        "name": discover["name"],
+        "networks": networks,
+        "number_of_episodes": number_of_episodes,
+        "number_of_seasons": len(seasons),
+        "origin_country": ["KR"],
+        "original_language": "ko",
+        "original_name": discover["original_name"],
+        "overview": discover["overview"],
+        "popularity": discover["popularity"],
+        "poster_path": discover["poster_path"],
+        "production_companies": [{"id": rng.randint(1, 10 ** 5), "logo_path": None, "name": f"Studio {rng.choice(SURNAMES)}",
+                                  "origin_country": "KR"} for _ in range(rng.randint(1, 4))],
+        "seasons": seasons,
+        "spoken_languages": [{"english_name": "Korean", "iso_639_1": "ko", "name": "한국어/조선말"}],
+        "status": rng.choice(STATUSES),
+        "tagline": _text(rng, 0, 8) if rng.random() < 0.5 else "",
+        "type": "Scripted",
+        "vote_average": discover["vote_average"],
+        "vote_count": discover["vote_count"],
+        "keywords": {"results": [{"id": 1000 + KEYWORDS.index(k), "name": k}
+                                 for k in rng.sample(KEYWORDS, rng.randint(0, 8))]},
+        "watch/providers": {"results": {"BR": {"link": f"https://example.org/watch/{show_id}", "flatrate": providers}}
+                            if providers else {}},
+    }
+
+
+def make_credits(show_id, people_pool_size=None):
+    """Payload de /tv/{id}/credits. As pessoas vêm de um pool compartilhado para haver colaborações."""
+    rng = _rng(show_id, 3)
+    pool = people_pool_size or 5000
+    people_rng = random.Random(0)
+
+    def person(person_id):
+        people_rng.seed(person_id)
+        return _person_name(people_rng)
+
+    cast = []
+    for order, person_id in enumerate(rng.sample(range(1, pool + 1), rng.randint(15, 50))):
+        name = person(person_id)
+        cast.append({
+            "adult": False, "gender": rng.randint(1, 2), "id": person_id, "known_for_department": "Acting",
+            "name": name, "original_name": name, "popularity": round(rng.uniform(1, 50), 3),
+            "profile_path": _image_path(rng), "character": f"{rng.choice(GIVEN_SYLLABLES)} {rng.choice(SURNAMES)}",
+            "credit_id": f"{show_id:x}{person_id:x}", "order": order,
+        })
+    crew = []
+    for person_id in rng.sample(range(pool + 1, 2 * pool + 1), rng.randint(10, 35)):
+        department, job = rng.choice(CREW_JOBS)
+        name = person(person_id)
+        crew.append({
+            "adult": False, "gender": rng.randint(1, 2), "id": person_id, "known_for_department": department,
+            "name": name, "original_name": name, "popularity": round(rng.uniform(1, 10), 3),
+            "profile_path": _image_path(rng) if rng.random() < 0.5 else None,
+            "credit_id": f"{show_id:x}{person_id:x}", "department": department, "job": job,
+        })
+    return {"cast": cast, "crew": crew, "id": show_id}
+
+
+def write_bronze_dataset(store_path, n_shows):
+    """Grava um dataset Bronze sintético com n_shows Kdramas no armazenamento endereçado por conteúdo (com manifesto)."""
+    people_pool_size = max(500, n_shows * 2)
+    entries = {}
+    for index in range(n_shows):
+        show_id = show_id_for_index(index)
+        payloads = {
+            "discover_info": make_discover_info(show_id),
+            "details": make_details(show_id),
+            "credits": make_credits(show_id, people_pool_size),
+        }
+        entries[str(show_id)] = {
+            artifact: bronze_store.put_object(data, store_path)[0] for artifact, data in payloads.items()
+        }
+    bronze_store.write_manifest(bronze_store.new_run_id(), entries, store_path=store_path)
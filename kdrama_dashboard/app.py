@@ -1,8 +1,23 @@
 # app.py
+import os
+import sys
+
 import streamlit as st
 import pandas as pd
 import pyodbc
 
+import queries
+
+# Índice de busca, cubo de agregados e demais tabelas são gerados pelo pipeline Gold (módulos em src/common)
+# e lidos do diretório Gold, ao lado da tabela do dashboard
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+from common.aggregate_cube import CUBE_FILENAME, cube_matches, index_cube, query_cube
+from common.schema import GOLD_DASHBOARD_SCHEMA, apply_schema
+
+GOLD_DATA_PATH = os.path.join(os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data")), "gold")
+SEARCH_INDEX_PATH = os.getenv('KDRAMA_SEARCH_INDEX', os.path.join(GOLD_DATA_PATH, "kdramas_search_index.json.gz"))
+
 # --- Configuração da Página ---
 # st.set_page_config define as configurações iniciais da sua página.
 # É bom definir um layout 'wide' para dashboards.
@@ -39,8 +54,54 @@ def load_data():
     df = pd.read_sql(query, conn)
     # Converter colunas de data que podem vir como texto
     df['first_air_date'] = pd.to_datetime(df['first_air_date'])
+    # Mesmo schema compacto da tabela Gold (a view renomeia as colunas de nota): o DataFrame fica em cache
+    df = apply_schema(df, {**GOLD_DASHBOARD_SCHEMA, 'vote_average': 'float32', 'vote_count': 'Int32'})
     return df
 
+# O índice é carregado uma única vez e compartilhado entre sessões.
+# Retorna None (busca desabilitada) se o arquivo não existir.
+@st.cache_resource
+def load_search_index():
+    if not os.path.exists(SEARCH_INDEX_PATH):
+        return None
+    from common.search_index import SearchIndex
+    return SearchIndex.load(SEARCH_INDEX_PATH)
+
+# Cubo de agregados (ano × gênero × emissora × streaming), indexado para consultas.
+# Retorna None (dashboard calcula a partir dos dados) se a tabela não existir ou se não for da mesma
+# execução do Gold que os dados da view (o cubo é lido do diretório Gold, os dados vêm do banco).
+@st.cache_resource
+def load_cube():
+    file_path = os.path.join(GOLD_DATA_PATH, CUBE_FILENAME)
+    if not os.path.exists(file_path):
+        return None
+    cube = index_cube(pd.read_parquet(file_path))
+    if not cube_matches(cube, load_data()):
+        st.warning("O cubo de agregados não corresponde aos dados do banco (outra execução do Gold). "
+                   "Os indicadores serão calculados a partir dos dados.")
+        return None
+    return cube
+
+# Colunas do Top 10 indexadas por id_tmdb: títulos do top 10 do cubo sem varrer o DataFrame
+@st.cache_resource
+def load_data_by_id():
+    return queries.index_by_id(load_data())
+
+# Resultado de cada combinação de filtros, calculado uma vez e reaproveitado nas interações seguintes
+# (busca, escolha de um Kdrama parecido...). cache_resource: sem cópia do DataFrame a cada leitura.
+@st.cache_resource(max_entries=32)
+def filter_data(year_range, selected_genres):
+    return queries.filter_kdramas(load_data(), year_range, list(selected_genres))
+
+# Tabelas Gold pré-calculadas (similares, colaborações): o dashboard só filtra.
+# Retorna None (seção oculta) se a tabela não existir.
+@st.cache_data
+def load_gold_table(filename):
+    file_path = os.path.join(GOLD_DATA_PATH, filename)
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_parquet(file_path)
+
 # --- Início do Layout do Dashboard ---
 
 st.title('📺 Análise de Kdramas Populares (2020-2024)')
@@ -65,35 +126,44 @@ try:
 
     # Filtro por gênero
     # Como 'genres_str' é uma string de gêneros separados por vírgula, precisamos obter os gêneros únicos
-    all_genres = set()
-    df['genres_str'].str.split(', ').apply(lambda genres: [all_genres.add(g) for g in genres if g])
-    sorted_genres = sorted(list(all_genres))
+    sorted_genres = queries.get_all_genres(df)
     
     selected_genres = st.sidebar.multiselect(
         "Selecione os Gêneros:",
         options=sorted_genres
     )
 
+    # Busca textual (títulos, sinopse e palavras-chave) pelo índice invertido gerado no Gold
+    search_index = load_search_index()
+    search_query = st.sidebar.text_input(
+        "Buscar Kdrama:",
+        placeholder="Título, sinopse ou palavra-chave",
+        disabled=search_index is None,
+        help=None if search_index is not None else "Índice de busca não encontrado. Execute o pipeline Gold."
+    )
+
     # --- Aplicar Filtros ao DataFrame ---
-    
-    # Filtrar por ano
-    df_filtered = df[
-        (df['release_year'] >= selected_year_range[0]) &
-        (df['release_year'] <= selected_year_range[1])
-    ]
-
-    # Filtrar por gênero (se algum gênero for selecionado)
-    if selected_genres:
-        # A lógica aqui verifica se QUALQUER um dos gêneros selecionados está na string de gêneros do drama
-        df_filtered = df_filtered[
-            df_filtered['genres_str'].apply(lambda genres: any(g in genres for g in selected_genres))
-        ]
+    # Filtrar por ano e por gênero (se algum gênero for selecionado). Só é feito quando algum
+    # elemento precisa das linhas filtradas (o cubo responde KPIs, Top 10 e contagem por ano)
+    def get_filtered():
+        return filter_data(tuple(selected_year_range), tuple(selected_genres))
+
+    # KPIs, Top 10 e contagem por ano: pelo cubo de agregados do Gold quando o filtro permite
+    # (até um gênero), somando poucas células; senão, a partir do DataFrame filtrado
+    cube = load_cube()
+    cube_answer = query_cube(cube, selected_year_range, selected_genres) if cube is not None else None
+    if cube_answer is not None:
+        (total_dramas_filtrados, nota_media_filtrada), df_top_10_pop, dramas_por_ano = \
+            queries.summarize_from_cube(load_data_by_id(), cube_answer, n=10)
+    else:
+        df_filtered = get_filtered()
+        total_dramas_filtrados, nota_media_filtrada = queries.compute_kpis(df_filtered)
+        df_top_10_pop = queries.top_kdramas_by_popularity(df_filtered, n=10)
+        dramas_por_ano = queries.kdramas_per_year(df_filtered)
 
     # --- Exibição dos Dados e Gráficos ---
 
     # KPIs (Key Performance Indicators)
-    total_dramas_filtrados = df_filtered.shape[0]
-    nota_media_filtrada = round(df_filtered['vote_average'].mean(), 2) if not df_filtered.empty else 0
 
     col1, col2 = st.columns(2)
     with col1:
@@ -103,21 +173,69 @@ try:
 
     st.markdown("---")
 
+    # Resultados da busca (respeitando os filtros de ano e gênero)
+    if search_index is not None and search_query.strip():
+        hits = search_index.search(search_query, limit=50)
+        df_search = queries.search_results(get_filtered(), hits)
+        st.subheader(f"Resultados da Busca: \"{search_query.strip()}\" ({len(df_search)})")
+        if df_search.empty:
+            st.info("Nenhum Kdrama encontrado para a busca com os filtros atuais.")
+        else:
+            st.dataframe(df_search, use_container_width=True)
+        st.markdown("---")
+
     # Gráfico: Top 10 Kdramas por Popularidade
     st.subheader("Top 10 Kdramas Mais Populares (Filtro Atual)")
-    df_top_10_pop = df_filtered.nlargest(10, 'popularity').sort_values('popularity', ascending=False)
-    st.dataframe(df_top_10_pop[['title_ptbr', 'release_year', 'popularity', 'vote_average']], use_container_width=True)
+    st.dataframe(df_top_10_pop, use_container_width=True)
 
 
     # Gráfico: Número de Kdramas por Ano
     st.subheader("Número de Kdramas por Ano de Lançamento")
-    dramas_por_ano = df_filtered['release_year'].value_counts().sort_index()
     st.bar_chart(dramas_por_ano)
     
 
+    # Kdramas em alta: maior ganho de popularidade em 7 dias (tabela Gold kdramas_em_alta, da série histórica)
+    df_rising = load_gold_table("kdramas_em_alta.parquet")
+    if df_rising is not None and not df_rising.empty:
+        st.subheader("Kdramas em Alta (Últimos 7 Dias)")
+        st.dataframe(
+            df_rising[['title_ptbr', 'popularity', 'popularity_delta_7d', 'popularity_pct_7d', 'vote_count_delta_7d']],
+            use_container_width=True
+        )
+
+    # Recomendações: Kdramas parecidos com o escolhido (tabela Gold similar_kdramas)
+    df_similar = load_gold_table("similar_kdramas.parquet")
+    if df_similar is not None and not get_filtered().empty:
+        st.subheader("Kdramas Parecidos")
+        titles_by_id = get_filtered().set_index('id_tmdb')['title_ptbr'].to_dict()
+        selected_id = st.selectbox(
+            "Escolha um Kdrama:",
+            options=list(titles_by_id.keys()),
+            format_func=lambda id_tmdb: titles_by_id[id_tmdb]
+        )
+        st.dataframe(queries.similar_kdramas(df_similar, selected_id, n=10), use_container_width=True)
+
+    # Grafo de colaboração (tabelas Gold colaboracoes_elenco, pares_ator_diretor e estatisticas_pessoas)
+    df_people = load_gold_table("estatisticas_pessoas.parquet")
+    if df_people is not None:
+        with st.expander("Colaborações entre elenco e direção"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Pessoas com mais Kdramas**")
+                st.dataframe(queries.top_people(df_people, role='ator', n=10), use_container_width=True)
+            with col2:
+                st.markdown("**Duplas ator–diretor mais frequentes**")
+                df_pairs = load_gold_table("pares_ator_diretor.parquet")
+                if df_pairs is not None:
+                    st.dataframe(df_pairs.head(10), use_container_width=True)
+            df_collaborations = load_gold_table("colaboracoes_elenco.parquet")
+            if df_collaborations is not None:
+                actor = st.selectbox("Parceiros de cena de:", options=queries.top_people(df_people, role='ator', n=50)['pessoa'])
+                st.dataframe(queries.collaborators_of(df_collaborations, actor, n=10), use_container_width=True)
+
     # Tabela com dados completos (ocultável)
     with st.expander("Ver tabela de dados completa (filtrada)"):
-        st.dataframe(df_filtered, use_container_width=True)
+        st.dataframe(get_filtered(), use_container_width=True)
 
 except Exception as e:
     st.error(f"Ocorreu um erro ao carregar o dashboard: {e}")
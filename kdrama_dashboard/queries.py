@@ -0,0 +1,106 @@
+# queries.py
+# Consultas do dashboard separadas do layout do Streamlit.
+# Assim elas podem ser reutilizadas (e medidas) fora da aplicação, ex: benchmarks/run_benchmarks.py.
+
+import pandas as pd
+
+# Colunas das tabelas de Top N
+TOP_COLUMNS = ['title_ptbr', 'release_year', 'popularity', 'vote_average']
+
+
+def _distinct_strings(series):
+    """Valores distintos de uma coluna de texto; em colunas 'category' (schema compacto) são as próprias categorias."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories.to_series()
+    return series.dropna().drop_duplicates()
+
+
+def get_all_genres(df):
+    """Retorna a lista ordenada de gêneros únicos presentes em 'genres_str' (separados por vírgula)."""
+    all_genres = set()
+    _distinct_strings(df['genres_str']).str.split(', ').apply(lambda genres: [all_genres.add(g) for g in genres if g])
+    return sorted(list(all_genres))
+
+
+def filter_kdramas(df, year_range, selected_genres=None):
+    """Filtra o DataFrame pelo intervalo de anos e (opcionalmente) por qualquer um dos gêneros selecionados."""
+    # release_year é Int16 anulável: Kdramas sem ano ficam fora de qualquer intervalo
+    df_filtered = df[
+        ((df['release_year'] >= year_range[0]) &
+         (df['release_year'] <= year_range[1])).fillna(False)
+    ]
+
+    if selected_genres:
+        # A lógica aqui verifica se QUALQUER um dos gêneros selecionados está na string de gêneros do drama.
+        # O teste roda uma vez por combinação distinta de gêneros, não por Kdrama
+        distinct = _distinct_strings(df_filtered['genres_str'])
+        matching = distinct[distinct.apply(lambda genres: any(g in genres for g in selected_genres))]
+        df_filtered = df_filtered[df_filtered['genres_str'].isin(matching)]
+    return df_filtered
+
+
+def compute_kpis(df_filtered):
+    """Retorna (total de Kdramas, nota média) do DataFrame filtrado."""
+    total_dramas = df_filtered.shape[0]
+    nota_media = round(df_filtered['vote_average'].mean(), 2) if not df_filtered.empty else 0
+    return total_dramas, nota_media
+
+
+def top_kdramas_by_popularity(df_filtered, n=10):
+    """Top N Kdramas mais populares do DataFrame filtrado."""
+    df_top = df_filtered.nlargest(n, 'popularity').sort_values('popularity', ascending=False)
+    return df_top[TOP_COLUMNS]
+
+
+def kdramas_per_year(df_filtered):
+    """Número de Kdramas por ano de lançamento."""
+    return df_filtered['release_year'].value_counts().sort_index()
+
+
+def search_results(df_filtered, hits):
+    """
+    Ordena os Kdramas do DataFrame filtrado conforme os resultados da busca ([(id_tmdb, score), ...]).
+    Kdramas encontrados pela busca mas fora do filtro atual são descartados.
+    """
+    scores = dict(hits)
+    df_hits = df_filtered[df_filtered['id_tmdb'].isin(scores.keys())]
+    df_hits = df_hits.assign(relevancia=df_hits['id_tmdb'].map(scores))
+    df_hits = df_hits.sort_values('relevancia', ascending=False)
+    return df_hits[['title_ptbr', 'title_original', 'release_year', 'popularity', 'vote_average', 'relevancia']]
+
+
+def similar_kdramas(df_similar, id_tmdb, n=10):
+    """Kdramas mais parecidos com `id_tmdb`, da tabela Gold similar_kdramas (já ordenada por rank)."""
+    df_neighbors = df_similar[df_similar['id_tmdb'] == id_tmdb].nsmallest(n, 'rank')
+    return df_neighbors[['rank', 'similar_title_ptbr', 'similarity', 'similar_id_tmdb']]
+
+
+def top_people(df_people, role='ator', n=10):
+    """Pessoas com mais Kdramas em uma função ('ator' ou 'diretor'), da tabela Gold estatisticas_pessoas."""
+    df_role = df_people[df_people['funcao'] == role]
+    return df_role.nlargest(n, 'total_kdramas')[['pessoa', 'total_kdramas', 'nota_media', 'popularidade_media']]
+
+
+def collaborators_of(df_collaborations, person, n=10):
+    """Atores que mais atuaram com `person`, da tabela Gold colaboracoes_elenco (pares armazenados uma única vez)."""
+    as_a = df_collaborations[df_collaborations['ator_a'] == person].rename(columns={'ator_b': 'parceiro'})
+    as_b = df_collaborations[df_collaborations['ator_b'] == person].rename(columns={'ator_a': 'parceiro'})
+    partners = pd.concat([as_a[['parceiro', 'kdramas_em_comum']], as_b[['parceiro', 'kdramas_em_comum']]])
+    return partners.nlargest(n, 'kdramas_em_comum').reset_index(drop=True)
+
+
+def index_by_id(df):
+    """Colunas do Top 10 indexadas por id_tmdb (para montar o Top 10 do cubo sem varrer o DataFrame)."""
+    return df.set_index('id_tmdb')[TOP_COLUMNS]
+
+
+def summarize_from_cube(df_by_id, cube_answer, n=10):
+    """
+    Converte a resposta do cubo (common/aggregate_cube.query_cube) nos mesmos formatos de
+    compute_kpis, top_kdramas_by_popularity e kdramas_per_year, sem varrer os Kdramas:
+    os títulos do top N vêm de `df_by_id` (index_by_id), na ordem de popularidade do cubo.
+    """
+    top_ids = [id_tmdb for id_tmdb, _ in cube_answer['top'][:n]]
+    df_top = df_by_id.reindex(top_ids).reset_index(drop=True)
+    kpis = (cube_answer['kdramas'], cube_answer['nota_media'])
+    return kpis, df_top, cube_answer['por_ano']
@@ -0,0 +1,144 @@
+import logging
+
+# Cubo de agregados ano × gênero × emissora × streaming para o dashboard.
+#
+# Construído pelo pipeline Gold (cubo_kdramas.parquet). Cada célula guarda medidas que podem ser
+# somadas entre células (contagem, somas de nota, de nota × votos, de votos e de popularidade, máximo
+# de popularidade e o top-k por popularidade), de modo que qualquer filtro de intervalo de anos é
+# respondido somando poucas células, sem varrer os Kdramas.
+#
+# Gênero, emissora e streaming são multivalorados (um Kdrama tem vários gêneros): somar as células
+# "Romance" e "Comédia" contaria duas vezes quem tem os dois. Por isso cada dimensão multivalorada
+# também tem o valor ALL ('*'), e cada Kdrama entra uma única vez em cada combinação de
+# (um valor ou '*') por dimensão. Assim o cubo responde exatamente filtros com até um valor por
+# dimensão multivalorada; filtros com vários valores na mesma dimensão (qualquer um de N gêneros)
+# não são resolvidos pelo cubo (query_cube retorna None e o chamador varre os dados).
+#
+# pandas é importado dentro das funções (o pipeline Gold importa este módulo no startup).
+
+CUBE_FILENAME = "cubo_kdramas.parquet"
+ALL = '*'
+TOP_K = 10
+
+# Dimensão do cubo -> coluna de lista da Silver
+MULTI_VALUED_DIMENSIONS = {'genre': 'genres', 'network': 'networks', 'provider': 'streaming_br'}
+
+
+def _distinct_values(items):
+    if items is None or isinstance(items, (str, float)):
+        return []
+    return list(dict.fromkeys(item for item in items if item))
+
+
+def build_cube(df_silver, k=TOP_K):
+    """Materializa o cubo a partir da Silver (uma linha por Kdrama, colunas de lista para as dimensões)."""
+    import pandas as pd
+
+    vote = pd.to_numeric(df_silver['vote_average_details'], errors='coerce')
+    votes = pd.to_numeric(df_silver['vote_count_details'], errors='coerce').fillna(0)
+    base = pd.DataFrame({
+        'release_year': pd.to_numeric(df_silver['release_year'], errors='coerce'),
+        'id_tmdb': df_silver['id_tmdb'].to_numpy(),
+        'popularity': pd.to_numeric(df_silver['popularity'], errors='coerce').fillna(0.0),
+        'vote_n': vote.notna().astype('int64'),
+        'vote_sum': vote.fillna(0.0),
+        'vote_weighted_sum': (vote * votes).fillna(0.0),
+        'vote_count_sum': votes,
+    }).dropna(subset=['release_year'])
+    base['release_year'] = base['release_year'].astype('int16')
+
+    # Cada Kdrama entra com cada um dos seus valores e com '*' em cada dimensão multivalorada
+    for dimension, column in MULTI_VALUED_DIMENSIONS.items():
+        values = df_silver.loc[base.index, column] if column in df_silver.columns else [None] * len(base)
+        base[dimension] = [[ALL] + _distinct_values(items) for items in values]
+    for dimension in MULTI_VALUED_DIMENSIONS:
+        base = base.explode(dimension, ignore_index=True)
+    logging.debug("Cubo: %d linhas Kdrama × célula antes da agregação.", len(base))
+
+    keys = ['genre', 'network', 'provider', 'release_year']
+    grouped = base.groupby(keys, sort=False)
+    cube = grouped.agg(
+        kdramas=('id_tmdb', 'size'),
+        vote_n=('vote_n', 'sum'),
+        vote_sum=('vote_sum', 'sum'),
+        vote_weighted_sum=('vote_weighted_sum', 'sum'),
+        vote_count_sum=('vote_count_sum', 'sum'),
+        popularity_sum=('popularity', 'sum'),
+        popularity_max=('popularity', 'max'),
+    )
+
+    # Top-k por célula: o top-k de uma união de células está contido na união dos top-k de cada célula
+    top = base.sort_values('popularity', ascending=False, kind='stable').groupby(keys, sort=False).head(k)
+    top_lists = top.groupby(keys, sort=False).agg(top_ids=('id_tmdb', list), top_popularity=('popularity', list))
+    cube = cube.join(top_lists).reset_index()
+    cube['kdramas'] = cube['kdramas'].astype('int32')
+    cube['vote_n'] = cube['vote_n'].astype('int32')
+    return cube.sort_values(keys, ignore_index=True)
+
+
+def index_cube(cube):
+    """
+    Prepara o cubo carregado do Parquet para consultas: {(gênero, emissora, streaming): células daquela
+    combinação indexadas e ordenadas pelo ano}. Uma consulta vira um acesso ao dict e um fatiamento por ano.
+    """
+    cube = cube.sort_values(['genre', 'network', 'provider', 'release_year'], ignore_index=True)
+    measures = cube.drop(columns=['genre', 'network', 'provider']).set_index('release_year')
+    return {key: measures.iloc[positions]
+            for key, positions in cube.groupby(['genre', 'network', 'provider'], sort=False).indices.items()}
+
+
+def cube_matches(indexed_cube, df, k=TOP_K):
+    """
+    Confere se o cubo veio da mesma execução do Gold que o DataFrame do dashboard (que pode vir de outra
+    fonte, ex: a view SQL): contagem de Kdramas por ano e top-k de popularidade da célula sem filtros.
+    """
+    years = df['release_year'].dropna()
+    cells = indexed_cube.get((ALL, ALL, ALL))
+    if cells is None:
+        return years.empty
+    counts = {int(year): int(count) for year, count in years.value_counts().items()}
+    if counts != {int(year): int(count) for year, count in cells['kdramas'].items()}:
+        return False
+    expected = df[df['release_year'].notna()].nlargest(k, 'popularity')['popularity']
+    top = sorted((pop for pops in cells['top_popularity'] for pop in pops), reverse=True)[:k]
+    return len(top) == len(expected) and all(
+        abs(a - b) <= 1e-4 * max(1.0, abs(b)) for a, b in zip(top, expected)
+    )
+
+
+def query_cube(indexed_cube, year_range, genres=None, networks=None, providers=None, k=TOP_K):
+    """
+    Responde um filtro pelo cubo indexado (index_cube). Cada filtro de dimensão multivalorada aceita
+    no máximo um valor; com mais de um, retorna None (o chamador deve varrer os Kdramas).
+    Retorna dict com kdramas, nota_media (média simples das notas), nota_ponderada (média ponderada pelos
+    votos), popularidade_media, por_ano (Series ano -> kdramas) e top (lista de (id_tmdb, popularidade)).
+    """
+    selection = []
+    for values in (genres, networks, providers):
+        values = list(values or [])
+        if len(values) > 1:
+            return None
+        selection.append(values[0] if values else ALL)
+
+    cells = indexed_cube.get(tuple(selection))
+    if cells is None: # Combinação sem nenhum Kdrama: usa a estrutura de outra célula, vazia
+        cells = next(iter(indexed_cube.values())).iloc[0:0]
+    cells = cells.loc[year_range[0]:year_range[1]]
+
+    total = int(cells['kdramas'].sum())
+    vote_n = cells['vote_n'].sum()
+    vote_count_sum = cells['vote_count_sum'].sum()
+    top = sorted(
+        ((id_tmdb, popularity)
+         for ids, pops in zip(cells['top_ids'], cells['top_popularity'])
+         for id_tmdb, popularity in zip(ids, pops)),
+        key=lambda item: item[1], reverse=True
+    )[:k]
+    return {
+        'kdramas': total,
+        'nota_media': round(cells['vote_sum'].sum() / vote_n, 2) if vote_n else 0,
+        'nota_ponderada': round(cells['vote_weighted_sum'].sum() / vote_count_sum, 2) if vote_count_sum else 0,
+        'popularidade_media': round(cells['popularity_sum'].sum() / total, 2) if total else 0,
+        'por_ano': cells['kdramas'].rename_axis('release_year').rename('count'),
+        'top': top,
+    }
@@ -1,36 +1,68 @@
 import os
-import requests
 import time
 import json
-from dotenv import load_dotenv
+import logging
 
-# Carregar variáveis de ambiente do arquivo .env na raiz do projeto
-# Isso assume que o script que usa este cliente está sendo executado da raiz do projeto
-# ou que o .env está em um local acessível.
-# Para maior robustez, o caminho para .env pode ser especificado.
+try:
+    from common import metrics
+except ImportError: # Execução direta deste arquivo (python src/common/api_client.py)
+    import metrics
+
+# Importar este módulo é barato: 'requests' e 'dotenv' só são carregados na primeira requisição,
+# e a API Key só é lida/validada nesse momento (ver _get_api_key).
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-load_dotenv(dotenv_path=os.path.join(project_root, '.env'))
 
-TMDB_API_KEY = os.getenv('TMDB_API_KEY')
-TMDB_API_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_API_KEY = None # Preenchida na primeira requisição
+# Pode ser sobrescrita (ex: servidor TMDB local dos benchmarks em benchmarks/mock_tmdb.py)
+TMDB_API_BASE_URL = os.getenv('TMDB_API_BASE_URL', "https://api.themoviedb.org/3")
+# Pausa (segundos) após cada requisição bem-sucedida
+REQUEST_DELAY_SECONDS = float(os.getenv('TMDB_REQUEST_DELAY', "0.5"))
 DEFAULT_LANGUAGE = "pt-BR" # Pode ser configurável
 
-# Verificação inicial da API Key
-if not TMDB_API_KEY:
-    raise ValueError("API Key do TMDB não encontrada. Verifique seu arquivo .env e a variável TMDB_API_KEY.")
+_session = None
+
+def _get_api_key():
+    """
+    Carrega o .env da raiz do projeto (apenas na primeira chamada) e retorna a API Key do TMDB.
+    Lança ValueError se a chave não estiver configurada.
+    """
+    global TMDB_API_KEY
+    if TMDB_API_KEY is None:
+        from dotenv import load_dotenv
+        # Carregar variáveis de ambiente do arquivo .env na raiz do projeto
+        load_dotenv(dotenv_path=os.path.join(project_root, '.env'))
+        TMDB_API_KEY = os.getenv('TMDB_API_KEY')
+    if not TMDB_API_KEY:
+        raise ValueError("API Key do TMDB não encontrada. Verifique seu arquivo .env e a variável TMDB_API_KEY.")
+    return TMDB_API_KEY
+
+def _get_session():
+    """Cria (na primeira chamada) uma sessão HTTP reutilizada entre requisições (keep-alive)."""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
 
-def _make_request(endpoint_path, params, method="GET", retries=3, delay_factor=0.5):
+def _make_request(endpoint_path, params, method="GET", retries=3, delay_factor=REQUEST_DELAY_SECONDS):
     """
     Função auxiliar para fazer requisições à API com tratamento de erro e retentativas.
     """
+    import requests # Já carregado por _get_session; import local mantém o módulo leve
+
     if 'api_key' not in params:
-        params['api_key'] = TMDB_API_KEY
+        params['api_key'] = _get_api_key()
     
     url = f"{TMDB_API_BASE_URL}{endpoint_path}"
+    session = _get_session()
     
     for attempt in range(retries):
+        response = None
+        request_start = time.perf_counter()
         try:
-            response = requests.request(method, url, params=params)
+            response = session.request(method, url, params=params)
+            metrics.record_request(endpoint_path, time.perf_counter() - request_start,
+                                   response.status_code, len(response.content))
             response.raise_for_status()  # Lança HTTPError para respostas 4xx/5xx
             
             # Respeitar os limites de taxa da API (mesmo em caso de sucesso)
@@ -43,14 +75,16 @@ def _make_request(endpoint_path, params, method="GET", retries=3, delay_factor=0
             # Para erros específicos como 429 (Too Many Requests), esperar mais
             if response.status_code == 429:
                 retry_after = int(response.headers.get("Retry-After", 5)) # Espera o tempo indicado ou 5s
-                print(f"Rate limit excedido (429). Tentando novamente em {retry_after} segundos...")
+                metrics.record_retry(endpoint_path, '429')
+                logging.warning(f"Rate limit excedido (429). Tentando novamente em {retry_after} segundos...")
                 time.sleep(retry_after)
             elif 500 <= response.status_code < 600: # Erros de servidor
-                print(f"Erro de servidor ({response.status_code}). Tentando novamente em { (attempt + 1) * 2 } segundos...")
+                metrics.record_retry(endpoint_path, '5xx')
+                logging.warning(f"Erro de servidor ({response.status_code}). Tentando novamente em { (attempt + 1) * 2 } segundos...")
                 time.sleep((attempt + 1) * 2) # Backoff exponencial simples
             else: # Outros erros HTTP (401, 404, etc.)
-                print(f"Erro HTTP: {http_err} - URL: {response.url}")
-                print(f"Response: {response.text}")
+                logging.error(f"Erro HTTP: {http_err} - URL: {response.url}")
+                logging.debug(f"Response: {response.text}")
                 # Para alguns erros como 401 (Unauthorized) ou 404 (Not Found), retentar pode não ajudar
                 if response.status_code in [401, 404]:
                     return None # Ou levantar a exceção
@@ -58,12 +92,15 @@ def _make_request(endpoint_path, params, method="GET", retries=3, delay_factor=0
                 if attempt == retries - 1:
                     raise
         except requests.exceptions.RequestException as req_err: # Outros erros (conexão, timeout)
-            print(f"Erro na requisição: {req_err}")
+            if response is None: # Falha antes de obter resposta (conexão, timeout)
+                metrics.record_request(endpoint_path, time.perf_counter() - request_start)
+            metrics.record_retry(endpoint_path, 'conexao')
+            logging.warning(f"Erro na requisição: {req_err}")
             if attempt == retries - 1:
                 raise
         
         if attempt < retries - 1:
-             print(f"Tentativa {attempt + 1} de {retries} falhou. Retentando...")
+             logging.info(f"Tentativa {attempt + 1} de {retries} falhou. Retentando...")
     return None # Se todas as tentativas falharem
 
 
@@ -0,0 +1,227 @@
+import os
+import json
+import queue
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from common import metrics
+
+# Armazenamento endereçado por conteúdo da Camada Bronze.
+#
+#   <store>/objects/ab/abcdef...json   payload JSON canônico, gravado uma única vez por hash (sha256)
+#   <store>/manifests/<run_id>.json    {id: {artefato: hash}} com o estado completo do Bronze naquela execução
+#   <store>/manifests/LATEST           run_id do manifesto mais recente
+#
+# Um payload que não mudou entre execuções não gera nenhuma escrita (apenas a entrada no manifesto),
+# e o histórico de qualquer execução passada continua disponível pelo seu manifesto.
+#
+# Na ingestão, as gravações passam por um WriteBehindWriter: uma thread dedicada grava os objetos
+# enquanto o laço principal já faz a próxima requisição à API.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data"))
+BRONZE_STORE_PATH = os.path.join(DATA_ROOT, "bronze", "store")
+
+ARTIFACTS = ("discover_info", "details", "credits")
+LATEST_POINTER = "LATEST"
+
+# Objetos aguardando gravação no WriteBehindWriter; com a fila cheia, quem enfileira espera o disco
+WRITE_QUEUE_SIZE = int(os.getenv('KDRAMA_BRONZE_WRITE_QUEUE', "64"))
+
+
+def canonical_json_bytes(data):
+    """Serialização determinística (chaves ordenadas, sem espaços) usada para o hash e para a gravação."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(payload_bytes):
+    return hashlib.sha256(payload_bytes).hexdigest()
+
+
+def object_path(object_hash, store_path=BRONZE_STORE_PATH):
+    return os.path.join(store_path, "objects", object_hash[:2], f"{object_hash}.json")
+
+
+def _atomic_write(file_path, payload_bytes):
+    """
+    Grava em um arquivo temporário no mesmo diretório e renomeia (nunca deixa um arquivo pela metade).
+    O conteúdo vai ao disco (fsync) antes do rename: após uma queda, um objeto ou manifesto já renomeado
+    não pode estar vazio ou truncado.
+    """
+    directory = os.path.dirname(file_path)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def put_object(data, store_path=BRONZE_STORE_PATH):
+    """
+    Armazena um payload e retorna (hash, gravado).
+    'gravado' é False quando um payload idêntico já existia (nenhuma escrita em disco).
+    """
+    payload_bytes = canonical_json_bytes(data)
+    object_hash = content_hash(payload_bytes)
+    return object_hash, _store_bytes(object_hash, payload_bytes, store_path)
+
+
+def _store_bytes(object_hash, payload_bytes, store_path):
+    """Grava o objeto se ainda não existir; retorna True se houve escrita."""
+    file_path = object_path(object_hash, store_path)
+    if os.path.exists(file_path):
+        return False
+    _atomic_write(file_path, payload_bytes)
+    return True
+
+
+class WriteBehindWriter:
+    """
+    Grava objetos no armazenamento em uma thread dedicada, sem bloquear quem busca os dados na API.
+
+    put() serializa o payload e calcula o hash (o manifesto precisa dele na hora) e enfileira a gravação.
+    A fila é limitada (WRITE_QUEUE_SIZE): se o disco ficar para trás, put() espera em vez de acumular
+    payloads na memória. flush() espera a fila esvaziar e close() também encerra a thread; o manifesto
+    só deve ser gravado depois deles, para nunca apontar para um objeto que ainda não está no disco.
+
+    Uma falha de gravação não derruba a thread: o erro é logado e o hash fica em `failed`, para que o
+    chamador retire do manifesto as entradas que dependem dele.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store_path=BRONZE_STORE_PATH, max_pending=WRITE_QUEUE_SIZE):
+        self.store_path = store_path
+        self.failed = set()
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="bronze-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, data):
+        """Enfileira a gravação de um payload e retorna o hash do conteúdo."""
+        if self._closed:
+            raise RuntimeError("WriteBehindWriter já foi fechado.")
+        payload_bytes = canonical_json_bytes(data)
+        object_hash = content_hash(payload_bytes)
+        self._queue.put((object_hash, payload_bytes))
+        return object_hash
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                object_hash, payload_bytes = item
+                with metrics.timed('write'):
+                    written = _store_bytes(object_hash, payload_bytes, self.store_path)
+                metrics.add_records('objetos_gravados' if written else 'objetos_inalterados')
+                logging.debug("Objeto %s %s.", object_hash, "gravado" if written else "inalterado")
+            except Exception as e:
+                self.failed.add(object_hash)
+                logging.error(f"Erro ao gravar o objeto Bronze {object_hash}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Bloqueia até que todos os objetos enfileirados tenham sido gravados (ou falhado)."""
+        self._queue.join()
+
+    def close(self):
+        """Grava o que falta na fila e encerra a thread. Pode ser chamado mais de uma vez."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_object(object_hash, store_path=BRONZE_STORE_PATH):
+    """Carrega um payload pelo hash; retorna None se não existir ou estiver corrompido."""
+    file_path = object_path(object_hash, store_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"Objeto Bronze não encontrado: {file_path}")
+    except json.JSONDecodeError as e:
+        logging.error(f"Erro ao decodificar objeto Bronze {file_path}: {e}")
+    return None
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+
+def _manifests_dir(store_path):
+    return os.path.join(store_path, "manifests")
+
+
+def latest_run_id(store_path=BRONZE_STORE_PATH):
+    pointer = os.path.join(_manifests_dir(store_path), LATEST_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def list_run_ids(store_path=BRONZE_STORE_PATH):
+    """Lista os run_ids com manifesto, do mais antigo ao mais recente."""
+    directory = _manifests_dir(store_path)
+    if not os.path.exists(directory):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def load_manifest(run_id=None, store_path=BRONZE_STORE_PATH):
+    """
+    Carrega o manifesto de uma execução (o mais recente se run_id for None). Retorna None se não houver,
+    inclusive quando o LATEST aponta para um manifesto apagado ou ilegível (o chamador faz uma execução completa).
+    """
+    run_id = run_id or latest_run_id(store_path)
+    if not run_id:
+        return None
+    manifest_path = os.path.join(_manifests_dir(store_path), f"{run_id}.json")
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"Manifesto Bronze {run_id} não encontrado ({manifest_path}). Ignorando o manifesto.")
+    except json.JSONDecodeError as e:
+        logging.warning(f"Manifesto Bronze {run_id} ilegível ({e}). Ignorando o manifesto.")
+    return None
+
+
+def write_manifest(run_id, entries, store_path=BRONZE_STORE_PATH, stats=None):
+    """
+    Grava o manifesto da execução e atualiza o ponteiro LATEST.
+    entries: {id (str): {artefato: hash}} com o estado completo do Bronze após a execução.
+    """
+    manifest = {
+        'run_id': run_id,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'stats': stats or {},
+        'entries': entries,
+    }
+    directory = _manifests_dir(store_path)
+    _atomic_write(os.path.join(directory, f"{run_id}.json"),
+                  json.dumps(manifest, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    _atomic_write(os.path.join(directory, LATEST_POINTER), run_id.encode('utf-8'))
+    return manifest
+
+
+def entry_fingerprint(entry):
+    """Identifica o conteúdo de um Kdrama no Bronze (tupla de hashes dos artefatos, na ordem de ARTIFACTS)."""
+    return "|".join(entry.get(artifact) or "" for artifact in ARTIFACTS)
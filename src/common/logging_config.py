@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+
+# Configuração de logging compartilhada pelos pipelines.
+# Os registros são enfileirados por um QueueHandler (não bloqueante) e escritos no stdout por uma
+# thread dedicada (QueueListener), de modo que o loop principal não espera pela escrita no terminal.
+# O formato pode ser texto (padrão) ou JSON (python-json-logger), útil para agregadores de log.
+
+LOG_LEVEL = os.getenv('KDRAMA_LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('KDRAMA_LOG_FORMAT', 'text') # 'text' ou 'json'
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+JSON_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+
+# Progresso padrão: um log a cada N registros ou T segundos (o que vier primeiro)
+PROGRESS_EVERY_SECONDS = float(os.getenv('KDRAMA_PROGRESS_SECONDS', "10"))
+
+_listener = None
+
+
+def _build_formatter(log_format):
+    if log_format == 'json':
+        try:
+            from pythonjsonlogger.json import JsonFormatter # python-json-logger >= 3.1
+        except ImportError:
+            try:
+                from pythonjsonlogger.jsonlogger import JsonFormatter
+            except ImportError:
+                JsonFormatter = None
+        if JsonFormatter:
+            return JsonFormatter(JSON_FORMAT, json_ensure_ascii=False)
+        print("python-json-logger não instalado. Usando logs em texto.", file=sys.stderr)
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(level=None, log_format=None):
+    """
+    Configura o logger raiz com um QueueHandler não bloqueante.
+    Chamadas repetidas não têm efeito. O listener é encerrado (e a fila esvaziada) na saída do processo.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    import logging.handlers # Import tardio: só necessário ao configurar (o módulo é relativamente pesado)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter((log_format or LOG_FORMAT).lower()))
+
+    log_queue = queue.SimpleQueue() # Sem limite: put() nunca bloqueia quem está logando
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel((level or LOG_LEVEL).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Para o listener, garantindo que todos os registros enfileirados sejam escritos."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class ProgressReporter:
+    """
+    Reporta o progresso de um loop a cada `every_n` registros ou `every_seconds` segundos,
+    com throughput e ETA (quando o total é conhecido), em vez de uma linha por registro.
+    """
+
+    def __init__(self, description, total=None, every_n=None, every_seconds=None):
+        self.description = description
+        self.total = total
+        self.every_n = every_n or (max(1, total // 20) if total else 1000)
+        self.every_seconds = every_seconds if every_seconds is not None else PROGRESS_EVERY_SECONDS
+        self.count = 0
+        self.start = time.perf_counter()
+        self._last_count = 0
+        self._last_time = self.start
+
+    def update(self, count=1):
+        self.count += count
+        now = time.perf_counter()
+        if self.count - self._last_count >= self.every_n or now - self._last_time >= self.every_seconds:
+            self._log(now)
+
+    def finish(self):
+        now = time.perf_counter()
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        logging.info(f"{self.description}: {self.count} concluídos em {elapsed:.1f}s ({rate:.1f}/s).")
+
+    def _log(self, now):
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        if self.total:
+            remaining = max(0, self.total - self.count)
+            eta = f"{remaining / rate:.0f}s" if rate > 0 else "?"
+            logging.info(
+                f"{self.description}: {self.count}/{self.total} ({self.count / self.total:.0%}) "
+                f"- {rate:.1f}/s - ETA {eta}"
+            )
+        else:
+            logging.info(f"{self.description}: {self.count} - {rate:.1f}/s")
+        self._last_count = self.count
+        self._last_time = now
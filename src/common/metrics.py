@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+# Instrumentação de performance dos pipelines.
+# As métricas são acumuladas em memória durante a execução de um estágio (bronze, silver ou gold)
+# e exportadas ao final como um relatório JSON e, se o prometheus_client estiver disponível,
+# no formato textfile do Prometheus (para o textfile collector do node_exporter) ou via Pushgateway.
+# Assim é possível saber se uma execução lenta foi culpa da API, do disco ou do pandas.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data"))
+METRICS_DIR = os.getenv('KDRAMA_METRICS_DIR', os.path.join(DATA_ROOT, "metrics"))
+PROMETHEUS_PUSHGATEWAY = os.getenv('PROMETHEUS_PUSHGATEWAY') # Ex: "localhost:9091" (opcional)
+
+# Buckets (em segundos) do histograma de latência das requisições, no estilo do Prometheus
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_state = {}
+
+
+def _new_state(stage):
+    return {
+        'stage': stage,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'start_perf': time.perf_counter(),
+        'requests': {},   # endpoint -> {'count', 'sum', 'buckets', 'status'}
+        'retries': {},    # endpoint -> {motivo: contagem}
+        'bytes_downloaded': 0,
+        'records': {},    # nome -> contagem de registros
+        'phases': {},     # nome -> segundos acumulados
+    }
+
+
+def start_run(stage):
+    """Zera as métricas acumuladas e inicia a contagem de tempo de um estágio."""
+    global _state
+    with _lock:
+        _state = _new_state(stage)
+
+
+def _current_state():
+    # Permite usar as funções de registro mesmo sem start_run (ex: api_client isolado)
+    global _state
+    if not _state:
+        _state = _new_state('desconhecido')
+    return _state
+
+
+def normalize_endpoint(endpoint_path):
+    """Substitui IDs numéricos do caminho por '{id}' para evitar um rótulo por Kdrama."""
+    return re.sub(r'/\d+', '/{id}', endpoint_path)
+
+
+def record_request(endpoint_path, elapsed_seconds, status_code=None, num_bytes=0):
+    """Registra a latência, o status HTTP e o tamanho de uma requisição à API."""
+    endpoint = normalize_endpoint(endpoint_path)
+    with _lock:
+        state = _current_state()
+        req = state['requests'].setdefault(endpoint, {
+            'count': 0, 'sum': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS), 'status': {}
+        })
+        req['count'] += 1
+        req['sum'] += elapsed_seconds
+        for i, upper_bound in enumerate(LATENCY_BUCKETS):
+            if elapsed_seconds <= upper_bound:
+                req['buckets'][i] += 1
+                break
+        status_key = str(status_code) if status_code is not None else 'erro'
+        req['status'][status_key] = req['status'].get(status_key, 0) + 1
+        state['bytes_downloaded'] += num_bytes or 0
+
+
+def record_retry(endpoint_path, reason):
+    """Registra uma retentativa (ex: reason='429', '5xx', 'conexao')."""
+    endpoint = normalize_endpoint(endpoint_path)
+    with _lock:
+        retries = _current_state()['retries'].setdefault(endpoint, {})
+        retries[reason] = retries.get(reason, 0) + 1
+
+
+def add_records(name, count=1):
+    """Soma registros processados (ex: 'kdramas', 'arquivos_json', 'linhas')."""
+    with _lock:
+        records = _current_state()['records']
+        records[name] = records.get(name, 0) + count
+
+
+def add_phase_time(phase, seconds):
+    """Acumula tempo gasto em uma fase (ex: 'parse', 'write', 'transform')."""
+    with _lock:
+        phases = _current_state()['phases']
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+def instrumented_stage(stage):
+    """Decorator que inicia as métricas do estágio e sempre exporta o relatório ao final (mesmo com erro)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_run(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                write_run_report()
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timed(phase):
+    """Context manager que acumula o tempo do bloco na fase indicada."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase_time(phase, time.perf_counter() - start)
+
+
+def peak_rss_bytes():
+    """Retorna o pico de memória residente (RSS) do processo em bytes, ou None se indisponível."""
+    try:
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+    except ImportError: # Windows não possui o módulo resource
+        pass
+    try:
+        import psutil
+        mem_info = psutil.Process().memory_info()
+        return getattr(mem_info, 'peak_wset', mem_info.rss)
+    except Exception:
+        return None
+
+
+def build_report():
+    """Monta o relatório da execução atual como um dicionário serializável em JSON."""
+    with _lock:
+        state = _current_state()
+        elapsed = time.perf_counter() - state['start_perf']
+        requests_report = {}
+        for endpoint, req in state['requests'].items():
+            requests_report[endpoint] = {
+                'count': req['count'],
+                'latency_sum_seconds': round(req['sum'], 6),
+                'latency_mean_seconds': round(req['sum'] / req['count'], 6) if req['count'] else None,
+                'latency_buckets': {str(b): c for b, c in zip(LATENCY_BUCKETS, req['buckets'])},
+                'latency_over_max_bucket': req['count'] - sum(req['buckets']),
+                'status_codes': dict(req['status']),
+            }
+        return {
+            'stage': state['stage'],
+            'started_at': state['started_at'],
+            'elapsed_seconds': round(elapsed, 6),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'bytes_downloaded': state['bytes_downloaded'],
+            'requests': requests_report,
+            'retries': {endpoint: dict(reasons) for endpoint, reasons in state['retries'].items()},
+            'records': dict(state['records']),
+            'records_per_second': {
+                name: round(count / elapsed, 3) if elapsed > 0 else None
+                for name, count in state['records'].items()
+            },
+            'phases_seconds': {phase: round(secs, 6) for phase, secs in state['phases'].items()},
+        }
+
+
+class _ReportCollector:
+    """Collector do prometheus_client que expõe um relatório já calculado."""
+
+    def __init__(self, report):
+        self.report = report
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+        stage = self.report['stage']
+        latency = HistogramMetricFamily(
+            'kdrama_api_request_latency_seconds', 'Latência das requisições à API do TMDB',
+            labels=['stage', 'endpoint']
+        )
+        for endpoint, req in self.report['requests'].items():
+            cumulative, buckets = 0, []
+            for upper_bound, count in req['latency_buckets'].items():
+                cumulative += count
+                buckets.append((upper_bound, cumulative))
+            buckets.append(('+Inf', req['count']))
+            latency.add_metric([stage, endpoint], buckets=buckets, sum_value=req['latency_sum_seconds'])
+        yield latency
+
+        retries = CounterMetricFamily(
+            'kdrama_api_retries', 'Retentativas de requisições por motivo', labels=['stage', 'endpoint', 'reason']
+        )
+        for endpoint, reasons in self.report['retries'].items():
+            for reason, count in reasons.items():
+                retries.add_metric([stage, endpoint, reason], count)
+        yield retries
+
+        yield _single_value(CounterMetricFamily, 'kdrama_bytes_downloaded', 'Bytes baixados da API',
+                            stage, self.report['bytes_downloaded'])
+
+        records = GaugeMetricFamily(
+            'kdrama_records_per_second', 'Registros processados por segundo', labels=['stage', 'name']
+        )
+        for name, rate in self.report['records_per_second'].items():
+            records.add_metric([stage, name], rate or 0.0)
+        yield records
+
+        phases = GaugeMetricFamily(
+            'kdrama_phase_seconds', 'Tempo gasto por fase do estágio', labels=['stage', 'phase']
+        )
+        for phase, seconds in self.report['phases_seconds'].items():
+            phases.add_metric([stage, phase], seconds)
+        yield phases
+
+        yield _single_value(GaugeMetricFamily, 'kdrama_stage_duration_seconds', 'Duração total do estágio',
+                            stage, self.report['elapsed_seconds'])
+        if self.report['peak_rss_bytes'] is not None:
+            yield _single_value(GaugeMetricFamily, 'kdrama_peak_rss_bytes', 'Pico de memória residente',
+                                stage, self.report['peak_rss_bytes'])
+
+
+def _single_value(family_cls, name, documentation, stage, value):
+    family = family_cls(name, documentation, labels=['stage'])
+    family.add_metric([stage], value)
+    return family
+
+
+def _export_prometheus(report, output_dir):
+    try:
+        from prometheus_client import CollectorRegistry, write_to_textfile, push_to_gateway
+    except ImportError:
+        logging.debug("prometheus_client não instalado. Exportação Prometheus ignorada.")
+        return
+
+    registry = CollectorRegistry()
+    registry.register(_ReportCollector(report))
+    write_to_textfile(os.path.join(output_dir, f"{report['stage']}.prom"), registry)
+    if PROMETHEUS_PUSHGATEWAY:
+        try:
+            push_to_gateway(PROMETHEUS_PUSHGATEWAY, job=f"kdrama_{report['stage']}", registry=registry)
+        except Exception as e:
+            logging.warning(f"Falha ao enviar métricas para o Pushgateway ({PROMETHEUS_PUSHGATEWAY}): {e}")
+
+
+def write_run_report(output_dir=None):
+    """
+    Exporta as métricas da execução atual.
+    Gera '<estagio>_run_report.json' (sobrescrito a cada execução), acrescenta uma linha em
+    '<estagio>_runs.jsonl' (histórico) e, se possível, '<estagio>.prom' para o Prometheus.
+    """
+    output_dir = output_dir or METRICS_DIR
+    report = build_report()
+    try:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        report_path = os.path.join(output_dir, f"{report['stage']}_run_report.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(output_dir, f"{report['stage']}_runs.jsonl"), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        _export_prometheus(report, output_dir)
+        logging.info(
+            f"Relatório de métricas salvo em: {report_path} "
+            f"({report['elapsed_seconds']:.2f}s, pico RSS: {_format_bytes(report['peak_rss_bytes'])})"
+        )
+    except Exception as e:
+        logging.error(f"Erro ao salvar relatório de métricas: {e}")
+    return report
+
+
+def _format_bytes(num_bytes):
+    if num_bytes is None:
+        return "N/A"
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
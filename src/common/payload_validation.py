@@ -0,0 +1,222 @@
+import os
+from collections import Counter
+
+# Validação dos payloads Bronze (discover_info, details, credits) contra JSON Schemas.
+#
+# Os schemas descrevem apenas os campos que a Camada Silver usa (campos extras são aceitos) e são
+# compilados com fastjsonschema, que gera uma função Python específica para cada schema: validar um
+# payload custa microssegundos, então a validação roda em toda execução. A auditoria do Bronze inteiro
+# (validate_manifest) divide os lotes entre processos, que leem os payloads do armazenamento pelo hash.
+#
+# Além do erro que reprova um payload, contamos o "drift" do schema: campos de primeiro nível que os
+# schemas não conhecem e o formato alternativo de 'keywords' (lista direta, como no TMDB v4).
+
+_NULLABLE_STRING = {'type': ['string', 'null']}
+_NULLABLE_NUMBER = {'type': ['number', 'null']}
+_NULLABLE_INTEGER = {'type': ['integer', 'null']}
+_NAMED_LIST = {'type': 'array', 'items': {'type': 'object', 'properties': {'name': _NULLABLE_STRING}}}
+
+PAYLOAD_SCHEMAS = {
+    'discover_info': {
+        'type': 'object',
+        'required': ['id'],
+        'properties': {
+            'id': {'type': 'integer'},
+            'name': _NULLABLE_STRING,
+            'original_name': _NULLABLE_STRING,
+            'overview': _NULLABLE_STRING,
+            'original_language': _NULLABLE_STRING,
+            'first_air_date': _NULLABLE_STRING,
+            'popularity': _NULLABLE_NUMBER,
+            'vote_average': _NULLABLE_NUMBER,
+            'vote_count': _NULLABLE_INTEGER,
+            'poster_path': _NULLABLE_STRING,
+            'backdrop_path': _NULLABLE_STRING,
+            'genre_ids': {'type': 'array', 'items': {'type': 'integer'}},
+            'origin_country': {'type': 'array', 'items': {'type': 'string'}},
+        },
+    },
+    'details': {
+        'type': 'object',
+        'required': ['id'],
+        'properties': {
+            'id': {'type': 'integer'},
+            'status': _NULLABLE_STRING,
+            'tagline': _NULLABLE_STRING,
+            'number_of_episodes': _NULLABLE_INTEGER,
+            'number_of_seasons': _NULLABLE_INTEGER,
+            'episode_run_time': {'type': 'array', 'items': {'type': 'integer'}},
+            'genres': _NAMED_LIST,
+            'production_companies': _NAMED_LIST,
+            'networks': _NAMED_LIST,
+            'vote_average': _NULLABLE_NUMBER,
+            'vote_count': _NULLABLE_INTEGER,
+            'keywords': {'anyOf': [
+                {'type': 'object', 'properties': {'results': _NAMED_LIST}},
+                _NAMED_LIST, # TMDB v4: lista direta
+            ]},
+            'watch/providers': {
+                'type': 'object',
+                'properties': {'results': {'type': 'object', 'additionalProperties': {
+                    'type': 'object',
+                    'properties': {'flatrate': {'type': 'array', 'items': {
+                        'type': 'object', 'properties': {'provider_name': _NULLABLE_STRING}
+                    }}},
+                }}},
+            },
+        },
+    },
+    'credits': {
+        'type': 'object',
+        'properties': {
+            'cast': _NAMED_LIST,
+            'crew': {'type': 'array', 'items': {'type': 'object', 'properties': {
+                'name': _NULLABLE_STRING, 'job': _NULLABLE_STRING, 'department': _NULLABLE_STRING,
+            }}},
+        },
+    },
+}
+
+# Campos de primeiro nível conhecidos além dos validados (presentes nos payloads do TMDB e ignorados pela Silver).
+# Qualquer outro campo novo é contado como drift.
+KNOWN_EXTRA_FIELDS = {
+    'discover_info': {'adult'},
+    'details': {'adult', 'created_by', 'first_air_date', 'homepage', 'in_production', 'languages',
+                'last_air_date', 'last_episode_to_air', 'name', 'next_episode_to_air', 'origin_country',
+                'original_language', 'original_name', 'overview', 'popularity', 'poster_path', 'backdrop_path',
+                'production_countries', 'seasons', 'spoken_languages', 'type'},
+    'credits': {'id'},
+}
+
+# Kdramas por lote (Silver valida um lote logo após carregá-lo; validate_manifest distribui lotes entre processos)
+VALIDATION_BATCH_SIZE = 500
+VALIDATION_WORKERS = int(os.getenv('KDRAMA_VALIDATION_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+_validators = None
+
+
+def get_validators():
+    """Compila os schemas (na primeira chamada do processo) e retorna {artefato: função de validação}."""
+    global _validators
+    if _validators is None:
+        import fastjsonschema
+        _validators = {artifact: fastjsonschema.compile(schema) for artifact, schema in PAYLOAD_SCHEMAS.items()}
+    return _validators
+
+
+def _known_fields(artifact):
+    return set(PAYLOAD_SCHEMAS[artifact]['properties']) | KNOWN_EXTRA_FIELDS.get(artifact, set())
+
+
+def validate_record(kdrama_id, payloads):
+    """
+    Valida os payloads de um Kdrama ({artefato: payload ou None}; payloads ausentes não são validados).
+    Retorna (erros, drift): erros é uma lista de {artifact, path, rule, message}; drift é um Counter.
+    """
+    import fastjsonschema
+
+    validators = get_validators()
+    errors, drift = [], Counter()
+    for artifact, payload in payloads.items():
+        if payload is None:
+            continue
+        try:
+            validators[artifact](payload)
+        except fastjsonschema.JsonSchemaValueException as e:
+            errors.append({'artifact': artifact, 'path': e.name, 'rule': e.rule, 'message': e.message})
+            drift[f"{artifact}:erro:{e.name}:{e.rule}"] += 1
+            continue
+        for field in payload.keys() - _known_fields(artifact):
+            drift[f"{artifact}:campo_novo:{field}"] += 1
+        if artifact == 'details' and isinstance(payload.get('keywords'), list):
+            drift["details:keywords_lista"] += 1
+    return errors, drift
+
+
+def _validate_chunk(chunk):
+    """Valida um pedaço do lote; retorna apenas os inválidos (os válidos não voltam pelo pickle)."""
+    invalid, drift = {}, Counter()
+    for kdrama_id, payloads in chunk:
+        errors, record_drift = validate_record(kdrama_id, payloads)
+        if errors:
+            invalid[kdrama_id] = errors
+        drift.update(record_drift)
+    return invalid, drift
+
+
+class BatchValidator:
+    """
+    Valida lotes de (kdrama_id, {artefato: payload}) no próprio processo e acumula os totais da execução.
+    (Enviar os payloads para outros processos custa mais que validá-los: o pickle de um lote leva ~1,4x o
+    tempo da validação. Para validar em paralelo, use validate_manifest, que envia apenas os hashes.)
+    """
+
+    def __init__(self):
+        self.validated = 0
+        self.invalid = 0
+        self.drift = Counter()
+
+    def validate(self, records):
+        """Retorna {kdrama_id: erros} dos registros inválidos do lote."""
+        invalid, drift = _validate_chunk(records)
+        self.validated += len(records)
+        self.invalid += len(invalid)
+        self.drift.update(drift)
+        return invalid
+
+
+def _validate_stored_chunk(args):
+    """Carrega do armazenamento Bronze e valida um pedaço do manifesto (executado nos processos do pool)."""
+    from common import bronze_store
+
+    chunk, store_path = args
+    records = [
+        (kdrama_id, {artifact: bronze_store.load_object(entry[artifact], store_path) if entry.get(artifact) else None
+                     for artifact in PAYLOAD_SCHEMAS})
+        for kdrama_id, entry in chunk
+    ]
+    return _validate_chunk(records)
+
+
+def validate_manifest(manifest_entries, store_path, workers=VALIDATION_WORKERS, batch_size=VALIDATION_BATCH_SIZE):
+    """
+    Valida em paralelo todos os Kdramas de um manifesto Bronze ({id: {artefato: hash}}).
+    Os processos recebem apenas os hashes e leem os payloads do armazenamento endereçado por conteúdo,
+    então só os erros e as contagens de drift voltam ao processo principal.
+    Retorna ({kdrama_id: erros}, Counter de drift).
+    """
+    items = sorted(manifest_entries.items())
+    chunks = [(items[i:i + batch_size], store_path) for i in range(0, len(items), batch_size)]
+    executor = None
+    if workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        get_validators() # Compila antes do fork: os processos herdam as funções prontas
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=get_validators)
+
+    invalid, drift = {}, Counter()
+    try:
+        results = executor.map(_validate_stored_chunk, chunks) if executor else map(_validate_stored_chunk, chunks)
+        for chunk_invalid, chunk_drift in results:
+            invalid.update(chunk_invalid)
+            drift.update(chunk_drift)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return invalid, drift
+
+
+if __name__ == '__main__':
+    # Auditoria do Bronze inteiro (ex: após mudar um schema), em paralelo:
+    #   python src/common/payload_validation.py
+    import sys
+    import json
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common import bronze_store
+
+    manifest = bronze_store.load_manifest()
+    if not manifest:
+        print("Nenhum manifesto Bronze encontrado.")
+        sys.exit(1)
+    invalid, drift = validate_manifest(manifest['entries'], bronze_store.BRONZE_STORE_PATH)
+    print(f"Manifesto {manifest['run_id']}: {len(manifest['entries'])} Kdramas, {len(invalid)} inválidos.")
+    print(json.dumps({'invalidos': invalid, 'drift': dict(drift.most_common())}, ensure_ascii=False, indent=2))
@@ -0,0 +1,124 @@
+# Schema compacto e explícito das tabelas Silver e Gold (e do DataFrame em cache no dashboard).
+#
+# - Strings repetitivas (status, idioma, listas concatenadas de gêneros/emissoras...) viram 'category',
+#   gravadas no Parquet com dictionary encoding e lidas de volta como 'category'.
+# - Contagens são inteiros anuláveis estreitos (Int16/Int32) em vez de float64 por causa dos NaNs.
+# - Notas e popularidade são float32.
+# - Textos únicos por Kdrama (títulos, sinopse) usam strings do Arrow ('string[pyarrow]'), bem menores que object.
+# - Colunas de lista têm tipo explícito no Parquet (ex: episode_run_time = list<int16>).
+#
+# pandas e pyarrow são importados dentro das funções (os estágios importam este módulo no startup).
+
+SILVER_SCHEMA = {
+    'id_tmdb': 'int32',
+    'title_original': 'string[pyarrow]',
+    'title_ptbr': 'string[pyarrow]',
+    'overview_ptbr': 'string[pyarrow]',
+    'popularity': 'float32',
+    'vote_average_discover': 'float32',
+    'vote_count_discover': 'Int32',
+    'first_air_date_str': 'string[pyarrow]',
+    'original_language': 'category',
+    'poster_path': 'string[pyarrow]',
+    'backdrop_path': 'string[pyarrow]',
+    'release_year': 'Int16',
+    'status': 'category',
+    'tagline': 'string[pyarrow]',
+    'number_of_episodes': 'Int16',
+    'number_of_seasons': 'Int16',
+    'vote_average_details': 'float32',
+    'vote_count_details': 'Int32',
+}
+
+# Tipo dos elementos de cada coluna de lista no Parquet
+SILVER_LIST_TYPES = {
+    'episode_run_time': 'int16',
+    'genres': 'string',
+    'production_companies': 'string',
+    'networks': 'string',
+    'keywords': 'string',
+    'streaming_br': 'string',
+    'cast_top10': 'string',
+    'directors': 'string',
+    'writers': 'string',
+}
+
+# Tabela do dashboard: só as listas concatenadas com poucas combinações distintas (gêneros, emissoras,
+# streaming) viram 'category'; produtoras, elenco, direção, roteiro e palavras-chave são quase únicas
+# por Kdrama (uma categoria por linha não economiza nada) e ficam como string do Arrow
+GOLD_DASHBOARD_SCHEMA = {
+    **{column: dtype for column, dtype in SILVER_SCHEMA.items()
+       if column not in ('vote_average_discover', 'vote_count_discover', 'first_air_date_str')},
+    'genres_str': 'category',
+    'networks_str': 'category',
+    'streaming_br_str': 'category',
+    'production_companies_str': 'string[pyarrow]',
+    'keywords_str': 'string[pyarrow]',
+    'cast_top10_str': 'string[pyarrow]',
+    'directors_str': 'string[pyarrow]',
+    'writers_str': 'string[pyarrow]',
+}
+GOLD_DASHBOARD_LIST_TYPES = {'episode_run_time': 'int16'}
+
+# Tabela Gold de Kdramas parecidos (pipelines/similarity.py)
+SIMILAR_KDRAMAS_SCHEMA = {
+    'id_tmdb': 'int32',
+    'rank': 'int16',
+    'similar_id_tmdb': 'int32',
+    'similarity': 'float32',
+    'similar_title_ptbr': 'string[pyarrow]',
+}
+
+_NULLABLE_INTEGERS = ('Int8', 'Int16', 'Int32', 'Int64')
+
+
+def apply_schema(df, schema):
+    """Converte as colunas presentes em `df` para os tipos do schema (colunas ausentes são ignoradas)."""
+    import pandas as pd
+
+    converted = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        values = df[column]
+        if dtype in _NULLABLE_INTEGERS or dtype.startswith(('int', 'float')):
+            # to_numeric antes do cast: colunas object/float64 com NaN e valores como 45.0
+            values = pd.to_numeric(values, errors='coerce')
+            if dtype in _NULLABLE_INTEGERS:
+                values = values.round()
+        converted[column] = values.astype(dtype)
+    return df.assign(**converted) if converted else df
+
+
+def arrow_schema(df, list_types=None):
+    """
+    Schema pyarrow do DataFrame com os tipos das colunas de lista fixados (a inferência do pyarrow
+    daria list<int64>, ou list<null> quando todas as listas estão vazias).
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for column, value_type in (list_types or {}).items():
+        index = schema.get_field_index(column)
+        if index >= 0:
+            schema = schema.set(index, pa.field(column, pa.list_(pa.type_for_alias(value_type))))
+    return schema
+
+
+def read_parquet(file_path, schema, columns=None):
+    """
+    Lê um Parquet gravado com write_parquet já no schema compacto. Categorias e inteiros anuláveis voltam
+    pelos metadados do pandas; as strings voltariam como 'string[python]' (objetos Python) e são reconvertidas.
+    """
+    import pandas as pd
+
+    return apply_schema(pd.read_parquet(file_path, columns=columns), schema)
+
+
+def write_parquet(df, file_path, list_types=None):
+    """Grava o DataFrame em Parquet preservando o schema compacto (categorias, inteiros anuláveis, listas tipadas)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, schema=arrow_schema(df, list_types), preserve_index=False)
+    pq.write_table(table, file_path, compression='zstd')
@@ -0,0 +1,239 @@
+import os
+import re
+import gzip
+import json
+import bisect
+import heapq
+import unicodedata
+
+# Índice invertido para a busca textual do dashboard (títulos, sinopse e palavras-chave).
+#
+# Construído pelo pipeline Gold e salvo ao lado da tabela do dashboard (JSON compactado com gzip).
+# Cada documento é um Kdrama; cada termo aponta para os documentos onde aparece, com o peso já
+# calculado na construção (BM25 por campo, somado com o peso de cada campo). Assim a consulta
+# é apenas uma soma de pesos das listas dos termos da busca, sem varrer o DataFrame.
+#
+# Termos indexados:
+#   w:<palavra>  palavra normalizada (minúsculas, sem acentos); a última palavra da busca também casa por prefixo
+#   g:<ngrama>   trigramas de palavras latinas e bigramas de sílabas Hangul, para buscas parciais e com erros
+#                (apenas títulos e palavras-chave: na sinopse multiplicariam o tamanho do índice sem ganho real)
+#
+# Exemplo:
+#   index = build_search_index(df)
+#   save_search_index(index, path)
+#   SearchIndex.load(path).search("pousando no amor")  ->  [(id_tmdb, score), ...]
+
+INDEX_VERSION = 1
+SEARCH_INDEX_FILENAME = "kdramas_search_index.json.gz"
+
+# Campos indexados e seus pesos (um título vale mais que uma menção na sinopse)
+FIELD_WEIGHTS = {
+    'title_ptbr': 3.0,
+    'title_original': 3.0,
+    'keywords_str': 1.5,
+    'overview_ptbr': 1.0,
+}
+NGRAM_FIELDS = ('title_ptbr', 'title_original', 'keywords_str')
+BM25_K1 = 1.2
+BM25_B = 0.75
+NGRAM_WEIGHT = 0.5 # Peso dos n-gramas em relação às palavras inteiras
+MIN_NGRAM_MATCH = 0.5 # Fração mínima dos n-gramas da busca que um documento precisa conter (evita ruído)
+MAX_PREFIX_EXPANSIONS = 50
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _is_hangul(char):
+    return '가' <= char <= '힣' or 'ᄀ' <= char <= 'ᇿ' or '㄰' <= char <= '㆏'
+
+
+def normalize_text(text):
+    """
+    Minúsculas e sem acentos, preservando o Hangul.
+    NFKD separa acentos (e também decompõe sílabas Hangul em jamos); removemos só as marcas
+    combinantes e recompomos com NFC, o que devolve as sílabas Hangul intactas.
+    """
+    if not isinstance(text, str) or not text: # None, NaN ou pd.NA (colunas string do Arrow)
+        return ""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    if decomposed.isascii():
+        return decomposed
+    # Marcas combinantes começam em U+0300: abaixo disso não é preciso consultar a categoria
+    stripped = "".join([c for c in decomposed if c < '\u0300' or unicodedata.category(c) != 'Mn'])
+    return unicodedata.normalize('NFC', stripped)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def token_ngrams(token):
+    """Bigramas de sílabas para palavras em Hangul; trigramas (com bordas) para as demais."""
+    if any(_is_hangul(c) for c in token):
+        if len(token) < 2:
+            return [token]
+        return [token[i:i + 2] for i in range(len(token) - 1)]
+    padded = f" {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _term_occurrences(texts, with_ngrams):
+    """
+    Ocorrências de termos de um campo: (posições dos documentos, termos, número de palavras por documento).
+    Cada texto distinto é tokenizado uma única vez, e os n-gramas são gerados uma vez por palavra distinta.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(texts)
+    unique_tokens = [tokenize(text) for text in uniques]
+    lengths = np.array([len(tokens) for tokens in unique_tokens] + [0])[codes] # código -1 (nulo) -> 0 palavras
+    words = pd.Series([unique_tokens[code] if code >= 0 else [] for code in codes]).explode().dropna()
+    occurrences = ["w:" + words]
+    if with_ngrams and not words.empty:
+        grams = {token: [f"g:{gram}" for gram in token_ngrams(token)] for token in words.unique()}
+        occurrences.append(words.map(grams).explode())
+    terms = pd.concat(occurrences)
+    return terms.index.to_numpy(dtype=np.int64), terms.to_numpy(dtype=object), lengths
+
+
+def build_search_index(df, id_field='id_tmdb', field_weights=FIELD_WEIGHTS):
+    """
+    Constrói o índice a partir de um DataFrame (uma linha por Kdrama). Retorna um dict serializável em JSON.
+    Depois da tokenização, tudo é feito em uma passada vetorizada: frequências por (termo, campo, documento),
+    IDF e BM25 em arrays numpy, e a soma dos campos por (termo, documento).
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = df.reset_index(drop=True)
+    doc_ids = [int(doc_id) for doc_id in df[id_field]]
+    n_docs = len(doc_ids)
+    fields = [field for field in field_weights if field in df.columns]
+    if not n_docs or not fields:
+        return {'version': INDEX_VERSION, 'ids': doc_ids, 'postings': {}}
+
+    docs, terms, field_codes, lengths = [], [], [], []
+    for field_code, field in enumerate(fields):
+        field_docs, field_terms, field_lengths = _term_occurrences(df[field], field in NGRAM_FIELDS)
+        docs.append(field_docs)
+        terms.append(field_terms)
+        field_codes.append(np.full(len(field_docs), field_code, dtype=np.int64))
+        lengths.append(field_lengths)
+    term_codes, term_names = pd.factorize(np.concatenate(terms))
+    if not len(term_codes): # Nenhum campo com texto indexável
+        return {'version': INDEX_VERSION, 'ids': doc_ids, 'postings': {}}
+    docs, field_codes = np.concatenate(docs), np.concatenate(field_codes)
+    lengths = np.vstack(lengths) # campo × documento
+
+    # Frequência de cada termo por (campo, documento)
+    keys, tf = np.unique((term_codes.astype(np.int64) * len(fields) + field_codes) * n_docs + docs, return_counts=True)
+    key_docs, key_fields = keys % n_docs, keys // n_docs % len(fields)
+    key_terms = keys // n_docs // len(fields)
+
+    # BM25 por campo: comprimento médio entre os documentos com o campo preenchido
+    filled = lengths > 0
+    avg_len = np.where(filled.any(axis=1), lengths.sum(axis=1) / np.maximum(filled.sum(axis=1), 1), 1.0)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[key_fields, key_docs] / avg_len[key_fields])
+    field_weight = np.array([field_weights[field] for field in fields])[key_fields]
+
+    # IDF pela frequência de documentos do termo em qualquer campo; soma dos campos por (termo, documento)
+    pairs, pair_index = np.unique(key_terms * n_docs + key_docs, return_inverse=True)
+    doc_freq = np.bincount(pairs // n_docs, minlength=len(term_names))
+    idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    scores = field_weight * idf[key_terms] * tf * (BM25_K1 + 1) / (tf + norm)
+    weights = np.round(np.bincount(pair_index, weights=scores), 3) # Pesos arredondados: índice bem menor em disco
+
+    # Listas ordenadas por documento (os pares já saem ordenados por termo e documento)
+    pair_terms, pair_docs = pairs // n_docs, pairs % n_docs
+    bounds = np.flatnonzero(np.diff(pair_terms)) + 1
+    starts, ends = np.r_[0, bounds], np.r_[bounds, len(pairs)]
+    postings = {
+        term_names[pair_terms[start]]: [pair_docs[start:end].tolist(), weights[start:end].tolist()]
+        for start, end in zip(starts, ends)
+    }
+    return {'version': INDEX_VERSION, 'ids': doc_ids, 'postings': postings}
+
+
+def save_search_index(index, file_path):
+    """Grava o índice (gzip + JSON) de forma atômica."""
+    directory = os.path.dirname(file_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    # Serializa de uma vez (json.dump direto no gzip faz milhares de escritas pequenas); nível 6 do gzip:
+    # ~3% maior que o padrão 9 e metade do tempo
+    payload = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+        f.write(payload)
+    os.replace(tmp_path, file_path)
+
+
+class SearchIndex:
+    """Índice carregado em memória. search() retorna [(id_tmdb, score), ...] do mais relevante ao menos."""
+
+    def __init__(self, index):
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"Versão do índice de busca incompatível: {index.get('version')} (esperada {INDEX_VERSION})")
+        self.ids = index['ids']
+        self.postings = index['postings']
+        self._words = sorted(term for term in self.postings if term.startswith("w:"))
+
+    @classmethod
+    def load(cls, file_path):
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _prefix_terms(self, prefix):
+        term = f"w:{prefix}"
+        start = bisect.bisect_left(self._words, term)
+        matches = []
+        for word in self._words[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not word.startswith(term):
+                break
+            matches.append(word)
+        return matches
+
+    def _accumulate(self, scores, term, factor=1.0):
+        posting = self.postings.get(term)
+        if posting is None:
+            return False
+        for doc_index, weight in zip(*posting):
+            scores[doc_index] = scores.get(doc_index, 0.0) + weight * factor
+        return True
+
+    def search(self, query, limit=20):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        word_scores = {}
+        for position, token in enumerate(tokens):
+            found = self._accumulate(word_scores, f"w:{token}")
+            # A última palavra pode estar incompleta (busca enquanto digita)
+            if position == len(tokens) - 1 and len(token) >= 2:
+                for term in self._prefix_terms(token):
+                    if term != f"w:{token}":
+                        self._accumulate(word_scores, term, factor=0.5 if found else 1.0)
+
+        # N-gramas: tolera erros de digitação e partes de palavras; exige uma fração mínima em comum
+        grams = {gram for token in tokens for gram in token_ngrams(token)}
+        gram_scores, gram_hits = {}, {}
+        for gram in grams:
+            posting = self.postings.get(f"g:{gram}")
+            if posting is None:
+                continue
+            for doc_index, weight in zip(*posting):
+                gram_scores[doc_index] = gram_scores.get(doc_index, 0.0) + weight
+                gram_hits[doc_index] = gram_hits.get(doc_index, 0) + 1
+
+        scores = dict(word_scores)
+        for doc_index, hits in gram_hits.items():
+            if hits / len(grams) >= MIN_NGRAM_MATCH:
+                scores[doc_index] = scores.get(doc_index, 0.0) + NGRAM_WEIGHT * gram_scores[doc_index] / len(grams)
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.ids[doc_index], round(score, 4)) for doc_index, score in ranked]
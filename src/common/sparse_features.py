@@ -0,0 +1,116 @@
+import logging
+
+# Matrizes esparsas (SciPy CSR) a partir das colunas de lista da Camada Silver
+# (genres, keywords, networks, directors, writers, cast_top10).
+# Usadas pelas tabelas Gold de similaridade e de colaboração: a montagem é vetorizada com
+# pandas (explode + factorize) e as contas são produtos de matrizes, sem laços por par de itens.
+#
+# numpy, scipy e pandas são importados dentro das funções (os estágios importam este módulo no startup).
+
+# Memória máxima (bytes) de um bloco denso de resultados em produtos bloco a bloco
+DEFAULT_BLOCK_MEMORY_BYTES = 256 * 1024 * 1024
+
+
+def incidence_matrix(list_series, min_df=1, dtype='float32'):
+    """
+    Monta a matriz de incidência linha × termo de uma coluna de listas.
+    Cada célula é 1 se o termo aparece na lista da linha (repetições são ignoradas).
+    Termos presentes em menos de `min_df` linhas são descartados.
+    Retorna (matriz CSR de shape (len(list_series), n_termos), array com os termos de cada coluna).
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+    n_rows = len(list_series)
+    exploded = pd.Series(list_series.to_numpy(), index=np.arange(n_rows)).explode()
+    exploded = exploded[exploded.notna() & (exploded != '')]
+    pairs = pd.DataFrame({'row': exploded.index.to_numpy(), 'term': exploded.to_numpy()}).drop_duplicates()
+
+    codes, terms = pd.factorize(pairs['term'])
+    if min_df > 1 and len(codes):
+        doc_freq = np.bincount(codes)
+        keep_terms = doc_freq >= min_df
+        keep = keep_terms[codes]
+        remap = np.cumsum(keep_terms) - 1 # novo índice de cada termo mantido
+        codes = remap[codes[keep]]
+        pairs = pairs[keep]
+        terms = terms[keep_terms]
+
+    data = np.ones(len(codes), dtype=dtype)
+    matrix = sparse.csr_matrix((data, (pairs['row'].to_numpy(), codes)), shape=(n_rows, len(terms)))
+    return matrix, np.asarray(terms)
+
+
+def tfidf_weight(matrix):
+    """
+    Aplica IDF suavizado (log((1 + n) / (1 + df)) + 1) às colunas de uma matriz de incidência
+    e normaliza as linhas (L2). Linhas vazias continuam vazias.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    n_rows = matrix.shape[0]
+    doc_freq = np.diff(matrix.tocsc().indptr)
+    idf = (np.log((1 + n_rows) / (1 + doc_freq)) + 1).astype(matrix.dtype)
+    weighted = matrix @ sparse.diags(idf)
+    return normalize_rows(weighted)
+
+
+def normalize_rows(matrix):
+    """Normaliza as linhas de uma matriz esparsa pela norma L2 (linhas zeradas são mantidas)."""
+    import numpy as np
+    from scipy import sparse
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags((1.0 / norms).astype(matrix.dtype)) @ matrix)
+
+
+def rows_per_block(n_columns, itemsize=4, memory_bytes=DEFAULT_BLOCK_MEMORY_BYTES):
+    """Quantas linhas de um resultado denso com `n_columns` colunas cabem no orçamento de memória."""
+    return max(1, memory_bytes // max(1, n_columns * itemsize))
+
+
+def blocked_top_k(matrix, k, exclude_self=True, min_score=0.0, memory_bytes=DEFAULT_BLOCK_MEMORY_BYTES):
+    """
+    Para cada linha de `matrix` (CSR, linhas normalizadas), os k vizinhos de maior produto interno
+    (similaridade do cosseno) entre as demais linhas.
+    O produto matrix @ matrix.T é calculado em blocos de linhas que cabem em `memory_bytes`,
+    e a seleção usa argpartition (O(n) por linha) em vez de ordenar cada linha inteira.
+    Retorna três arrays alinhados (linha, vizinho, score), ordenados por linha e score decrescente;
+    vizinhos com score <= min_score são descartados.
+    """
+    import numpy as np
+
+    n_rows = matrix.shape[0]
+    if n_rows < 2 or k <= 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    k = min(k, n_rows - 1)
+    transposed = matrix.T.tocsc()
+    # O produto esparso de um bloco pode ser quase denso (ex: gêneros comuns): ~12 bytes por célula
+    # no resultado CSR + 4 bytes na cópia densa float32
+    block_size = rows_per_block(n_rows, itemsize=16, memory_bytes=memory_bytes)
+    out_rows, out_neighbors, out_scores = [], [], []
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        scores = (matrix[start:stop] @ transposed).toarray().astype(np.float32, copy=False)
+        if exclude_self:
+            scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        block_rows = np.repeat(np.arange(start, stop), k)
+        keep = top_scores.ravel() > min_score
+        out_rows.append(block_rows[keep])
+        out_neighbors.append(top.ravel()[keep])
+        out_scores.append(top_scores.ravel()[keep])
+        logging.debug("Bloco de similaridade %d-%d de %d concluído.", start, stop, n_rows)
+
+    return np.concatenate(out_rows), np.concatenate(out_neighbors), np.concatenate(out_scores)
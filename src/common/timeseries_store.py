@@ -0,0 +1,105 @@
+import os
+import logging
+from datetime import date, datetime
+
+# Série histórica de popularidade e votos dos Kdramas.
+#
+# A cada execução a Camada Silver grava um snapshot compacto (id, popularidade, nota, votos)
+# em uma partição Parquet por dia, no estilo Hive:
+#
+#   <store>/snapshot_date=2025-06-01/part-0.parquet
+#
+# Reexecutar no mesmo dia substitui a partição do dia (gravação atômica), sem duplicar o snapshot.
+# Leitores abrem apenas as partições das datas que precisam (ver pipelines/trends.py).
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data"))
+TIMESERIES_STORE_PATH = os.path.join(DATA_ROOT, "timeseries", "popularity")
+
+PARTITION_PREFIX = "snapshot_date="
+PARTITION_FILENAME = "part-0.parquet"
+SNAPSHOT_COLUMNS = ['id_tmdb', 'popularity', 'vote_average', 'vote_count']
+
+
+def snapshot_date_for_run(run_id=None):
+    """Data do snapshot: a do run_id do manifesto Bronze (%Y%m%dT...) ou, sem manifesto, a data de hoje."""
+    if run_id:
+        try:
+            return datetime.strptime(run_id[:8], "%Y%m%d").date()
+        except ValueError:
+            logging.warning(f"run_id Bronze fora do formato esperado: {run_id}. Usando a data de hoje.")
+    return date.today()
+
+
+def partition_path(snapshot_date, store_path=TIMESERIES_STORE_PATH):
+    return os.path.join(store_path, f"{PARTITION_PREFIX}{snapshot_date.isoformat()}", PARTITION_FILENAME)
+
+
+def list_snapshot_dates(store_path=TIMESERIES_STORE_PATH):
+    """Datas com snapshot gravado, da mais antiga à mais recente."""
+    if not os.path.exists(store_path):
+        return []
+    dates = []
+    for name in os.listdir(store_path):
+        if name.startswith(PARTITION_PREFIX) and os.path.exists(os.path.join(store_path, name, PARTITION_FILENAME)):
+            dates.append(date.fromisoformat(name[len(PARTITION_PREFIX):]))
+    return sorted(dates)
+
+
+def partition_mtime(snapshot_date, store_path=TIMESERIES_STORE_PATH):
+    return os.path.getmtime(partition_path(snapshot_date, store_path))
+
+
+def build_snapshot(df):
+    """
+    Snapshot compacto a partir de um DataFrame da Silver: id int32, popularidade/nota float32, votos Int32,
+    ordenado por id (melhor compressão e leitura por faixa de ids).
+    """
+    import pandas as pd
+
+    snapshot = pd.DataFrame({
+        'id_tmdb': pd.to_numeric(df['id_tmdb'], errors='coerce'),
+        'popularity': pd.to_numeric(df['popularity'], errors='coerce'),
+        'vote_average': pd.to_numeric(df['vote_average_details'], errors='coerce'),
+        'vote_count': pd.to_numeric(df['vote_count_details'], errors='coerce'),
+    })
+    snapshot = snapshot.dropna(subset=['id_tmdb']).drop_duplicates('id_tmdb', keep='last')
+    return snapshot.astype({
+        'id_tmdb': 'int32', 'popularity': 'float32', 'vote_average': 'float32', 'vote_count': 'Int32',
+    }).sort_values('id_tmdb', ignore_index=True)
+
+
+def write_snapshot(snapshot, snapshot_date, store_path=TIMESERIES_STORE_PATH):
+    """Grava (ou substitui) a partição do dia de forma atômica e retorna o caminho do arquivo."""
+    file_path = partition_path(snapshot_date, store_path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    snapshot.to_parquet(tmp_path, index=False, engine='pyarrow', compression='zstd')
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def read_snapshots(dates, store_path=TIMESERIES_STORE_PATH, columns=None):
+    """
+    Lê apenas as partições das datas pedidas e devolve um único DataFrame com a coluna snapshot_date.
+    Retorna None se nenhuma das datas existir.
+    """
+    import pandas as pd
+
+    frames = []
+    for snapshot_date in dates:
+        file_path = partition_path(snapshot_date, store_path)
+        if not os.path.exists(file_path):
+            continue
+        frame = pd.read_parquet(file_path, columns=columns)
+        frame['snapshot_date'] = pd.Timestamp(snapshot_date)
+        frames.append(frame)
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def latest_date_on_or_before(dates, target, not_before=None):
+    """A data mais recente em `dates` (ordenada) que não passa de `target` (nem é anterior a `not_before`), ou None."""
+    candidates = [d for d in dates if d <= target and (not_before is None or d >= not_before)]
+    return candidates[-1] if candidates else None
@@ -1,5 +1,4 @@
 import os
-import json
 import logging
 from datetime import datetime
 
@@ -13,28 +12,17 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from common import api_client # Agora deve importar corretamente
-
-# Configuração básica de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout) # Para ver logs no console
-        # Se quiser salvar em arquivo também:
-        # logging.FileHandler("bronze_ingestion.log")
-    ]
-)
+from common import metrics
+from common import bronze_store
+from common.logging_config import setup_logging, ProgressReporter
 
 # --- Configurações do Pipeline Bronze ---
 # Caminho base para salvar os dados brutos.
-# Vamos criar uma subpasta com a data da execução para organizar.
+# Os payloads são gravados no armazenamento endereçado por conteúdo (common/bronze_store.py):
+# cada payload distinto é gravado uma única vez e cada execução grava um manifesto (id, artefato) -> hash.
 PROJECT_ROOT = os.path.abspath(os.path.join(current_dir, "..", "..")) # Raiz do projeto
-BRONZE_BASE_PATH = os.path.join(PROJECT_ROOT, "data", "bronze", "raw_kdramas")
-# Cria uma subpasta com a data da execução
-# CURRENT_EXECUTION_DATE = datetime.now().strftime("%Y-%m-%d")
-# BRONZE_SAVE_PATH = os.path.join(BRONZE_BASE_PATH, CURRENT_EXECUTION_DATE)
-# Por simplicidade inicial, vamos salvar direto em BRONZE_BASE_PATH
-BRONZE_SAVE_PATH = BRONZE_BASE_PATH
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data")) # Sobrescrevível (ex: benchmarks)
+BRONZE_SAVE_PATH = os.path.join(DATA_ROOT, "bronze", "store")
 
 
 # Período de busca para "últimos 5 anos" (ajuste conforme necessário)
@@ -48,7 +36,7 @@ DEFAULT_LANGUAGE_PT = "pt-BR"
 
 # Limite de páginas a buscar no endpoint /discover.
 # A API do TMDB limita a 500 páginas para /discover.
-MAX_PAGES_TO_FETCH_DISCOVER = 5 # Comece com poucas páginas para teste.
+MAX_PAGES_TO_FETCH_DISCOVER = int(os.getenv('KDRAMA_MAX_DISCOVER_PAGES', "5")) # Comece com poucas páginas para teste.
                                # Mude para um valor maior (até 500) para uma coleta completa.
 
 # --- Funções Auxiliares ---
@@ -58,26 +46,60 @@ def ensure_dir_exists(directory_path):
         os.makedirs(directory_path)
         logging.info(f"Diretório criado: {directory_path}")
 
-def save_json_to_bronze(data, file_name_prefix, data_type_suffix, base_path=BRONZE_SAVE_PATH):
-    """Salva dados (dicionário Python) como um arquivo JSON na camada Bronze."""
+def save_json_to_bronze(data, file_name_prefix, data_type_suffix, manifest_entries=None, base_path=BRONZE_SAVE_PATH,
+                        writer=None):
+    """
+    Salva dados (dicionário Python) na camada Bronze e retorna o hash do conteúdo.
+    Payloads idênticos a um já armazenado não geram escrita. Se 'manifest_entries' for informado,
+    registra nele o hash em manifest_entries[file_name_prefix][data_type_suffix].
+    Com um 'writer' (bronze_store.WriteBehindWriter), a gravação é apenas enfileirada: o arquivo só
+    está garantido no disco depois de writer.flush() ou writer.close().
+    """
     if not data:
-        logging.warning(f"Nenhum dado para salvar para {file_name_prefix}_{data_type_suffix}.json")
-        return
+        logging.warning(f"Nenhum dado para salvar para {file_name_prefix}_{data_type_suffix}")
+        return None
 
-    ensure_dir_exists(base_path)
-    file_path = os.path.join(base_path, f"{file_name_prefix}_{data_type_suffix}.json")
-    
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        logging.info(f"Dados salvos em: {file_path}")
+        if writer is not None:
+            # Serialização + eventual espera por espaço na fila (backpressure do disco)
+            with metrics.timed('write_enqueue'):
+                object_hash = writer.put(data)
+            written = None
+        else:
+            with metrics.timed('write'):
+                object_hash, written = bronze_store.put_object(data, base_path)
     except IOError as e:
-        logging.error(f"Erro ao salvar JSON em {file_path}: {e}")
+        logging.error(f"Erro ao salvar {file_name_prefix}_{data_type_suffix} na Camada Bronze: {e}")
+        return None
     except TypeError as e:
-        logging.error(f"Erro de tipo ao serializar JSON para {file_path}: {e}. Dados: {data}")
+        logging.error(f"Erro de tipo ao serializar JSON para {file_name_prefix}_{data_type_suffix}: {e}. Dados: {data}")
+        return None
+
+    if written is not None: # Com writer, a contagem de gravados/inalterados é feita na thread de gravação
+        metrics.add_records('objetos_gravados' if written else 'objetos_inalterados')
+    if manifest_entries is not None:
+        manifest_entries.setdefault(file_name_prefix, {})[data_type_suffix] = object_hash
+    logging.debug("%s_%s: %s (%s)", file_name_prefix, data_type_suffix, object_hash,
+                  "enfileirado" if written is None else "gravado" if written else "inalterado") # Por arquivo: apenas em DEBUG
+    return object_hash
+
+def drop_unwritten_entries(manifest_entries, failed_hashes, previous_entries):
+    """
+    Retira do manifesto os Kdramas que apontam para objetos cuja gravação falhou: voltam à entrada
+    do manifesto anterior (se houver) ou saem do manifesto. Retorna quantos Kdramas foram afetados.
+    """
+    affected = [kdrama_id for kdrama_id, entry in manifest_entries.items()
+                if any(object_hash in failed_hashes for object_hash in entry.values())]
+    for kdrama_id in affected:
+        if kdrama_id in previous_entries:
+            manifest_entries[kdrama_id] = previous_entries[kdrama_id]
+        else:
+            del manifest_entries[kdrama_id]
+    return len(affected)
 
 
 # --- Lógica Principal do Pipeline Bronze ---
+@metrics.instrumented_stage('bronze')
 def run_bronze_ingestion():
     """
     Executa o pipeline de ingestão da Camada Bronze.
@@ -135,11 +157,13 @@ def run_bronze_ingestion():
 
     current_kdramas_on_page = initial_discover_response.get('results', [])
     all_discovered_kdramas_info.extend(current_kdramas_on_page)
-    logging.info(f"Página 1: {len(current_kdramas_on_page)} Kdramas descobertos.")
+    logging.debug("Página 1: %d Kdramas descobertos.", len(current_kdramas_on_page))
 
     # Loop para as páginas restantes
+    pages_progress = ProgressReporter("Páginas do /discover", total=pages_to_fetch)
+    pages_progress.update()
     for page_num in range(2, pages_to_fetch + 1):
-        logging.info(f"Buscando /discover - página {page_num} de {pages_to_fetch}...")
+        logging.debug("Buscando /discover - página %d de %d...", page_num, pages_to_fetch)
         discover_params['page'] = page_num
         discover_response = api_client.discover_media(
             media_type="tv",
@@ -149,53 +173,83 @@ def run_bronze_ingestion():
         if discover_response and 'results' in discover_response:
             current_kdramas_on_page = discover_response.get('results', [])
             all_discovered_kdramas_info.extend(current_kdramas_on_page)
-            logging.info(f"Página {page_num}: {len(current_kdramas_on_page)} Kdramas descobertos.")
+            logging.debug("Página %d: %d Kdramas descobertos.", page_num, len(current_kdramas_on_page))
         else:
             logging.warning(f"Falha ao buscar ou nenhum resultado na página {page_num} do /discover.")
             # Pode-se adicionar uma lógica para parar se muitas páginas falharem
+        pages_progress.update()
+    pages_progress.finish()
     
     logging.info(f"Total de {len(all_discovered_kdramas_info)} informações de Kdramas descobertas (antes de buscar detalhes).")
 
     # 3. Para cada Kdrama descoberto, buscar detalhes e créditos, e salvar
+    # O manifesto parte do estado anterior: Kdramas não buscados nesta execução mantêm seus hashes.
+    run_id = bronze_store.new_run_id()
+    previous_manifest = bronze_store.load_manifest(store_path=BRONZE_SAVE_PATH)
+    manifest_entries = dict(previous_manifest['entries']) if previous_manifest else {}
     kdramas_processed_count = 0
-    for discover_info in all_discovered_kdramas_info:
-        kdrama_id = discover_info.get('id')
-        original_name = discover_info.get('original_name', 'NomeDesconhecido')
-        
-        if not kdrama_id:
-            logging.warning(f"Kdrama descoberto sem ID: {discover_info.get('name')}. Pulando.")
-            continue
-            
-        logging.info(f"Processando Kdrama ID: {kdrama_id} ({original_name})...")
-        
-        # Salvar a informação do /discover
-        save_json_to_bronze(discover_info, str(kdrama_id), "discover_info")
-        
-        # Buscar e salvar detalhes da série
-        details_data = api_client.get_media_details(
-            media_type="tv", 
-            media_id=kdrama_id, 
-            language=DEFAULT_LANGUAGE_PT,
-            append_to_response="keywords,watch/providers" # Opcional
-        )
-        if details_data:
-            save_json_to_bronze(details_data, str(kdrama_id), "details")
-        else:
-            logging.warning(f"Não foram encontrados detalhes para o Kdrama ID: {kdrama_id}")
-            
-        # Buscar e salvar créditos da série
-        credits_data = api_client.get_media_credits(
-            media_type="tv", 
-            media_id=kdrama_id
-            # language=DEFAULT_LANGUAGE_PT # Para nomes de personagens, se aplicável
-        )
-        if credits_data:
-            save_json_to_bronze(credits_data, str(kdrama_id), "credits")
-        else:
-            logging.warning(f"Não foram encontrados créditos para o Kdrama ID: {kdrama_id}")
-        
-        kdramas_processed_count += 1
-        logging.info(f"Kdrama ID: {kdrama_id} ({original_name}) processado e dados salvos.")
+    progress = ProgressReporter("Kdramas ingeridos", total=len(all_discovered_kdramas_info))
+    # Gravação write-behind: enquanto uma thread grava os objetos, o laço já faz a próxima requisição
+    writer = bronze_store.WriteBehindWriter(store_path=BRONZE_SAVE_PATH)
+    try:
+        for discover_info in all_discovered_kdramas_info:
+            kdrama_id = discover_info.get('id')
+            original_name = discover_info.get('original_name', 'NomeDesconhecido')
+
+            if not kdrama_id:
+                logging.warning(f"Kdrama descoberto sem ID: {discover_info.get('name')}. Pulando.")
+                continue
+
+            logging.debug("Processando Kdrama ID: %s (%s)...", kdrama_id, original_name)
+            # Entradas novas substituem as anteriores deste Kdrama (um artefato ausente agora não herda o antigo)
+            kdrama_entries = {}
+
+            # Salvar a informação do /discover
+            save_json_to_bronze(discover_info, str(kdrama_id), "discover_info", kdrama_entries, writer=writer)
+
+            # Buscar e salvar detalhes da série
+            details_data = api_client.get_media_details(
+                media_type="tv",
+                media_id=kdrama_id,
+                language=DEFAULT_LANGUAGE_PT,
+                append_to_response="keywords,watch/providers" # Opcional
+            )
+            if details_data:
+                save_json_to_bronze(details_data, str(kdrama_id), "details", kdrama_entries, writer=writer)
+            else:
+                logging.warning(f"Não foram encontrados detalhes para o Kdrama ID: {kdrama_id}")
+
+            # Buscar e salvar créditos da série
+            credits_data = api_client.get_media_credits(
+                media_type="tv",
+                media_id=kdrama_id
+                # language=DEFAULT_LANGUAGE_PT # Para nomes de personagens, se aplicável
+            )
+            if credits_data:
+                save_json_to_bronze(credits_data, str(kdrama_id), "credits", kdrama_entries, writer=writer)
+            else:
+                logging.warning(f"Não foram encontrados créditos para o Kdrama ID: {kdrama_id}")
+
+            if str(kdrama_id) in kdrama_entries:
+                manifest_entries[str(kdrama_id)] = kdrama_entries[str(kdrama_id)]
+            kdramas_processed_count += 1
+            metrics.add_records('kdramas')
+            logging.debug("Kdrama ID: %s (%s) processado e dados salvos.", kdrama_id, original_name)
+            progress.update()
+    finally:
+        # Esvazia a fila antes do manifesto: ele só pode apontar para objetos que já estão no disco
+        writer.close()
+        if writer.failed:
+            dropped = drop_unwritten_entries(manifest_entries, writer.failed,
+                                             previous_manifest['entries'] if previous_manifest else {})
+            logging.error(f"{len(writer.failed)} objeto(s) não foram gravados; {dropped} Kdrama(s) mantêm a entrada "
+                          f"do manifesto anterior ou ficam fora do manifesto.")
+        # Mesmo em caso de falha, registra o que já foi gravado nesta execução
+        bronze_store.write_manifest(run_id, manifest_entries, store_path=BRONZE_SAVE_PATH,
+                                    stats={'kdramas_processados': kdramas_processed_count})
+        logging.info(f"Manifesto Bronze {run_id} gravado ({len(manifest_entries)} Kdramas).")
+
+    progress.finish()
 
     logging.info(f"Pipeline de ingestão da Camada Bronze finalizado. {kdramas_processed_count} Kdramas processados.")
 
@@ -206,5 +260,7 @@ if __name__ == '__main__':
     # e que você está executando este script da raiz do projeto ou que o sys.path está correto.
     # Exemplo de execução (da raiz do projeto kdrama_analytics_project/):
     # python src/pipelines/bronze.py
-    
+
+    # Configuração de logging (handler não bloqueante; nível e formato via KDRAMA_LOG_LEVEL / KDRAMA_LOG_FORMAT)
+    setup_logging()
     run_bronze_ingestion()
\ No newline at end of file
@@ -0,0 +1,110 @@
+import logging
+
+from common import metrics
+from common.sparse_features import incidence_matrix
+
+# Tabelas Gold do grafo de colaboração entre pessoas (elenco e direção).
+#
+# A partir das colunas cast_top10 e directors da Silver montamos matrizes de incidência esparsas
+# Kdrama × pessoa (A para atores, D para diretores; a matriz pessoa × Kdrama é a transposta).
+# Todas as contagens saem de produtos de matrizes:
+#   A.T @ A    -> Kdramas em comum entre dois atores (diagonal = total de Kdramas do ator)
+#   A.T @ D    -> Kdramas em comum entre um ator e um diretor
+#   M.T @ nota -> soma das notas dos Kdramas de cada pessoa (idem para popularidade)
+#
+# A Silver guarda apenas os nomes (o TMDB não é consultado de novo aqui): pessoas homônimas são unificadas.
+
+COLLABORATIONS_FILENAME = "colaboracoes_elenco.parquet"
+ACTOR_DIRECTOR_PAIRS_FILENAME = "pares_ator_diretor.parquet"
+PEOPLE_STATS_FILENAME = "estatisticas_pessoas.parquet"
+
+MIN_SHARED_KDRAMAS = 2 # Pares com menos Kdramas em comum não entram nas tabelas de pares
+TOP_ACTOR_DIRECTOR_PAIRS = 100
+
+
+def _upper_pairs(matrix, min_count):
+    """Pares (i, j) com i < j da matriz simétrica de coocorrência com contagem >= min_count."""
+    from scipy import sparse
+
+    upper = sparse.triu(matrix, k=1).tocoo()
+    keep = upper.data >= min_count
+    return upper.row[keep], upper.col[keep], upper.data[keep]
+
+
+def _pairs_frame(names_a, names_b, rows, cols, counts, column_a, column_b):
+    import pandas as pd
+
+    df_pairs = pd.DataFrame({
+        column_a: names_a[rows],
+        column_b: names_b[cols],
+        'kdramas_em_comum': counts.astype('int32'),
+    })
+    return df_pairs.sort_values(['kdramas_em_comum', column_a, column_b], ascending=[False, True, True],
+                                ignore_index=True)
+
+
+def _person_stats(incidence, names, role, df_silver, co_appearance=None):
+    """Agregados por pessoa (total de Kdramas, nota média, popularidade média) via produtos esparsos."""
+    import numpy as np
+    import pandas as pd
+
+    person_by_show = incidence.T.tocsr()
+    total = np.asarray(incidence.sum(axis=0)).ravel()
+    stats = {'pessoa': names, 'funcao': role, 'total_kdramas': total.astype('int32')}
+
+    for column, output in (('vote_average_details', 'nota_media'), ('popularity', 'popularidade_media')):
+        if column not in df_silver.columns:
+            continue
+        values = pd.to_numeric(df_silver[column], errors='coerce').to_numpy(dtype='float64')
+        present = ~np.isnan(values)
+        sums = person_by_show @ np.where(present, values, 0.0)
+        counts = person_by_show @ present.astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[output] = np.round(np.where(counts > 0, sums / counts, np.nan), 2)
+
+    if co_appearance is not None:
+        # Colaboradores distintos: não zeros da linha, sem contar a própria pessoa (diagonal)
+        stats['total_colaboradores'] = (np.diff(co_appearance.indptr) - (co_appearance.diagonal() > 0)).astype('int32')
+    return pd.DataFrame(stats)
+
+
+def build_collaboration_tables(df_silver, min_shared=MIN_SHARED_KDRAMAS, top_pairs=TOP_ACTOR_DIRECTOR_PAIRS):
+    """
+    Retorna {nome do arquivo: DataFrame} com:
+      - colaboracoes_elenco: pares de atores que atuaram juntos em >= min_shared Kdramas
+      - pares_ator_diretor: os top_pairs pares ator–diretor mais frequentes
+      - estatisticas_pessoas: agregados por pessoa e função (ator/diretor)
+    """
+    import pandas as pd
+
+    tables = {}
+    df_silver = df_silver.reset_index(drop=True)
+    if 'cast_top10' not in df_silver.columns:
+        logging.warning("Coluna 'cast_top10' não encontrada na Silver. Grafo de colaboração não gerado.")
+        return tables
+
+    actors, actor_names = incidence_matrix(df_silver['cast_top10'])
+    metrics.add_records('atores', len(actor_names))
+    co_appearance = (actors.T @ actors).tocsr()
+    rows, cols, counts = _upper_pairs(co_appearance, min_shared)
+    tables[COLLABORATIONS_FILENAME] = _pairs_frame(actor_names, actor_names, rows, cols, counts, 'ator_a', 'ator_b')
+    logging.info(f"Grafo de colaboração: {len(actor_names)} atores, {len(rows)} pares com >= {min_shared} Kdramas em comum.")
+
+    people_stats = [_person_stats(actors, actor_names, 'ator', df_silver, co_appearance)]
+
+    if 'directors' in df_silver.columns:
+        directors, director_names = incidence_matrix(df_silver['directors'])
+        metrics.add_records('diretores', len(director_names))
+        actor_director = (actors.T @ directors).tocoo()
+        keep = actor_director.data >= min_shared
+        df_pairs = _pairs_frame(actor_names, director_names, actor_director.row[keep], actor_director.col[keep],
+                                actor_director.data[keep], 'ator', 'diretor')
+        tables[ACTOR_DIRECTOR_PAIRS_FILENAME] = df_pairs.head(top_pairs)
+        people_stats.append(_person_stats(directors, director_names, 'diretor', df_silver))
+    else:
+        logging.warning("Coluna 'directors' não encontrada na Silver. Pares ator–diretor não gerados.")
+
+    tables[PEOPLE_STATS_FILENAME] = pd.concat(people_stats, ignore_index=True).sort_values(
+        ['total_kdramas', 'pessoa'], ascending=[False, True], ignore_index=True
+    )
+    return tables
@@ -1,22 +1,25 @@
 import os
-import pandas as pd
 import logging
 import sys
 
-# Configuração básica de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Adiciona o diretório src ao sys.path para permitir importações de common
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import metrics
+from common import schema
+from common.logging_config import setup_logging
+from common.aggregate_cube import CUBE_FILENAME, build_cube
+from common.search_index import SEARCH_INDEX_FILENAME, build_search_index, save_search_index
+from pipelines.similarity import SIMILAR_KDRAMAS_FILENAME, build_similar_kdramas
+from pipelines.collaboration import build_collaboration_tables
+from pipelines.trends import RISING_FILENAME, build_trend_tables, save_trends_state
 
 # --- Configurações do Pipeline Gold ---
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-SILVER_DATA_PATH = os.path.join(PROJECT_ROOT, "data", "silver")
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data")) # Sobrescrevível (ex: benchmarks)
+SILVER_DATA_PATH = os.path.join(DATA_ROOT, "silver")
 SILVER_INPUT_FILENAME = "kdramas_silver.parquet"
-GOLD_DATA_PATH = os.path.join(PROJECT_ROOT, "data", "gold")
+GOLD_DATA_PATH = os.path.join(DATA_ROOT, "gold")
 
 # --- Funções Auxiliares ---
 def ensure_dir_exists(directory_path):
@@ -24,22 +27,52 @@ def ensure_dir_exists(directory_path):
         os.makedirs(directory_path)
         logging.info(f"Diretório criado: {directory_path}")
 
-def save_df_to_gold(df, filename, base_path=GOLD_DATA_PATH):
-    """Salva um DataFrame como Parquet na Camada Gold."""
-    if df.empty:
+def save_df_to_gold(df, filename, base_path=GOLD_DATA_PATH, list_types=None, allow_empty=False):
+    """
+    Salva um DataFrame como Parquet na Camada Gold (list_types: tipo dos elementos das colunas de lista).
+    Retorna True se o arquivo foi gravado. Com allow_empty, um DataFrame vazio também é gravado
+    (substitui a tabela da execução anterior, em vez de deixá-la no lugar).
+    """
+    if df.empty and not allow_empty:
         logging.warning(f"DataFrame para {filename} está vazio. Nenhum arquivo será salvo.")
-        return
+        return False
     
     ensure_dir_exists(base_path)
     file_path = os.path.join(base_path, filename)
     try:
-        df.to_parquet(file_path, index=False, engine='pyarrow')
+        with metrics.timed('write'):
+            schema.write_parquet(df, file_path, list_types)
+        metrics.add_records('linhas_gold', len(df))
         logging.info(f"Dados da Camada Gold salvos em: {file_path} ({len(df)} linhas)")
+        return True
     except Exception as e:
         logging.error(f"Erro ao salvar DataFrame da Camada Gold como Parquet ({filename}): {e}")
+        return False
+
+def join_list(value):
+    """Converte uma coluna de lista (list ou array vindo do Parquet) em string separada por vírgulas."""
+    if value is None or isinstance(value, (str, float)):
+        return ''
+    return ', '.join(str(item) for item in value)
+
+def save_search_index_to_gold(df, base_path=GOLD_DATA_PATH):
+    """Constrói o índice de busca textual do dashboard e o salva ao lado da tabela do dashboard."""
+    if df.empty:
+        return
+    file_path = os.path.join(base_path, SEARCH_INDEX_FILENAME)
+    try:
+        with metrics.timed('search_index'):
+            index = build_search_index(df)
+            save_search_index(index, file_path)
+        metrics.add_records('termos_indice_busca', len(index['postings']))
+        logging.info(f"Índice de busca salvo em: {file_path} ({len(index['ids'])} documentos, {len(index['postings'])} termos)")
+    except Exception as e:
+        logging.error(f"Erro ao construir o índice de busca: {e}")
 
 # --- Lógica Principal do Pipeline Gold ---
+@metrics.instrumented_stage('gold')
 def run_gold_pipeline():
+
     logging.info("Iniciando pipeline da Camada Gold...")
     ensure_dir_exists(GOLD_DATA_PATH)
 
@@ -50,7 +83,9 @@ def run_gold_pipeline():
         return
     
     try:
-        df_silver = pd.read_parquet(silver_file_path)
+        with metrics.timed('parse'):
+            df_silver = schema.read_parquet(silver_file_path, schema.SILVER_SCHEMA)
+        metrics.add_records('kdramas', len(df_silver))
         logging.info(f"Dados da Camada Silver carregados com sucesso ({len(df_silver)} linhas).")
     except Exception as e:
         logging.error(f"Erro ao carregar dados da Camada Silver: {e}. Abortando.")
@@ -73,9 +108,8 @@ def run_gold_pipeline():
     for col in list_cols_to_str:
         if col in df_dashboard.columns:
             # Converte a lista para uma string separada por vírgulas, tratando None ou listas vazias
-            df_dashboard[f'{col}_str'] = df_dashboard[col].apply(
-                lambda x: ', '.join(x) if isinstance(x, list) and x else ''
-            )
+            # (lidas do Parquet, as listas chegam como arrays, não como list)
+            df_dashboard[f'{col}_str'] = df_dashboard[col].apply(join_list)
     
     # Selecionar colunas finais para o dashboard (incluindo as novas _str se desejar)
     # Esta é uma sugestão, ajuste conforme sua necessidade de visualização
@@ -89,8 +123,12 @@ def run_gold_pipeline():
     ]
     # Filtrar para manter apenas colunas que existem no df_dashboard
     final_cols_for_dashboard = [col for col in cols_for_dashboard if col in df_dashboard.columns]
-    df_dashboard_final = df_dashboard[final_cols_for_dashboard]
-    save_df_to_gold(df_dashboard_final, "kdramas_finais_para_dashboard.parquet")
+    # Schema compacto: as strings concatenadas repetitivas (gêneros, emissoras...) viram 'category'
+    df_dashboard_final = schema.apply_schema(df_dashboard[final_cols_for_dashboard], schema.GOLD_DASHBOARD_SCHEMA)
+    save_df_to_gold(df_dashboard_final, "kdramas_finais_para_dashboard.parquet",
+                    list_types=schema.GOLD_DASHBOARD_LIST_TYPES)
+    # Índice invertido para a busca do dashboard (títulos, sinopse e palavras-chave)
+    save_search_index_to_gold(df_dashboard_final)
 
 
     # --- Tabela 2: estatisticas_por_genero.parquet ---
@@ -117,7 +155,8 @@ def run_gold_pipeline():
     # Top 5 Kdramas por ano (exemplo, baseado em popularidade)
     # Considerar apenas dramas com um número mínimo de votos para relevância da nota
     VOTE_COUNT_THRESHOLD = 50 # Ajuste conforme necessário
-    df_com_votos_suficientes = df_silver[df_silver['vote_count_details'] >= VOTE_COUNT_THRESHOLD].copy()
+    # (vote_count_details é Int32 anulável: sem votos conta como abaixo do threshold)
+    df_com_votos_suficientes = df_silver[(df_silver['vote_count_details'] >= VOTE_COUNT_THRESHOLD).fillna(False)].copy()
     
     if not df_com_votos_suficientes.empty and 'release_year' in df_com_votos_suficientes.columns:
         df_com_votos_suficientes['rank_popularidade_ano'] = df_com_votos_suficientes.groupby('release_year')['popularity'].rank(method='first', ascending=False)
@@ -144,9 +183,57 @@ def run_gold_pipeline():
     else:
         logging.warning("Coluna 'release_year' não encontrada ou vazia. Tendência anual não gerada.")
 
+
+    # --- Tabela 5: similar_kdramas.parquet ---
+    # Top-k Kdramas mais parecidos de cada um (atributos esparsos TF-IDF + produtos de matrizes em blocos)
+    try:
+        with metrics.timed('similarity'):
+            df_similar = build_similar_kdramas(df_silver)
+        save_df_to_gold(df_similar, SIMILAR_KDRAMAS_FILENAME)
+    except Exception as e:
+        logging.error(f"Erro ao calcular os Kdramas similares: {e}")
+
+    # --- Tabelas 6 a 8: grafo de colaboração (colaboracoes_elenco, pares_ator_diretor, estatisticas_pessoas) ---
+    # Contagens de coatuação e agregados por pessoa a partir de matrizes de incidência esparsas
+    try:
+        with metrics.timed('collaboration'):
+            collaboration_tables = build_collaboration_tables(df_silver)
+        for filename, df_table in collaboration_tables.items():
+            save_df_to_gold(df_table, filename)
+    except Exception as e:
+        logging.error(f"Erro ao construir o grafo de colaboração: {e}")
+
+    # --- Tabelas 9 a 11: tendências de popularidade (popularidade_mensal, tendencia_popularidade, kdramas_em_alta) ---
+    # A partir da série histórica diária gravada pela Silver; o rollup mensal é atualizado incrementalmente
+    try:
+        with metrics.timed('trends'):
+            trend_tables, trends_state = build_trend_tables(df_silver, GOLD_DATA_PATH)
+        # kdramas_em_alta vazia também é gravada: sem Kdramas em alta, a lista anterior não pode continuar no dashboard
+        saved = [save_df_to_gold(df_table, filename, allow_empty=(filename == RISING_FILENAME))
+                 for filename, df_table in trend_tables.items()]
+        # O estado marca as partições como já incluídas no rollup: só é gravado se todas as tabelas foram salvas
+        if all(saved):
+            save_trends_state(GOLD_DATA_PATH, trends_state)
+        else:
+            logging.error("Alguma tabela de tendências não foi salva. Estado não atualizado: a próxima execução recalcula.")
+    except Exception as e:
+        logging.error(f"Erro ao calcular as tendências de popularidade: {e}")
+
+    # --- Tabela 12: cubo_kdramas.parquet ---
+    # Cubo ano × gênero × emissora × streaming com medidas somáveis (KPIs, top-k e contagem por ano do dashboard)
+    try:
+        with metrics.timed('cube'):
+            df_cube = build_cube(df_silver)
+        save_df_to_gold(df_cube, CUBE_FILENAME)
+    except Exception as e:
+        logging.error(f"Erro ao construir o cubo de agregados: {e}")
+
     logging.info("Pipeline da Camada Gold finalizado.")
 
 if __name__ == '__main__':
     # Exemplo de execução (da raiz do projeto kdrama_analytics_project/):
     # python src/pipelines/gold.py
+
+    # Configuração de logging (handler não bloqueante; nível e formato via KDRAMA_LOG_LEVEL / KDRAMA_LOG_FORMAT)
+    setup_logging()
     run_gold_pipeline()
\ No newline at end of file
@@ -1,6 +1,6 @@
+import io
 import os
 import json
-import pandas as pd
 import logging
 import sys
 from datetime import datetime
@@ -8,22 +8,32 @@ from datetime import datetime
 # Ajustar o path para importações (se necessário, embora não usemos api_client aqui diretamente)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
-# sys.path.insert(0, parent_dir) # Descomente se precisar importar de 'common'
+sys.path.insert(0, parent_dir) # Para importar de 'common'
 
-# Configuração básica de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from common import metrics
+from common import bronze_store
+from common import timeseries_store
+from common import payload_validation
+from common import schema
+from common.logging_config import setup_logging, ProgressReporter
 
 # --- Configurações do Pipeline Silver ---
 PROJECT_ROOT = os.path.abspath(os.path.join(current_dir, "..", ".."))
-BRONZE_DATA_PATH = os.path.join(PROJECT_ROOT, "data", "bronze", "raw_kdramas")
-SILVER_DATA_PATH = os.path.join(PROJECT_ROOT, "data", "silver")
+DATA_ROOT = os.getenv('KDRAMA_DATA_DIR', os.path.join(PROJECT_ROOT, "data")) # Sobrescrevível (ex: benchmarks)
+BRONZE_STORE_PATH = os.path.join(DATA_ROOT, "bronze", "store") # Armazenamento endereçado por conteúdo (manifestos)
+BRONZE_DATA_PATH = os.path.join(DATA_ROOT, "bronze", "raw_kdramas") # Layout antigo ({id}_<artefato>.json), usado se não houver manifesto
+SILVER_DATA_PATH = os.path.join(DATA_ROOT, "silver")
 SILVER_OUTPUT_FILENAME = "kdramas_silver.parquet"
+# Registros Bronze reprovados na validação de schema (um diretório por execução, com o relatório de drift)
+SILVER_QUARANTINE_PATH = os.path.join(SILVER_DATA_PATH, "quarantine")
+VALIDATION_REPORT_FILENAME = "validation_report.json"
+# Hashes Bronze de cada Kdrama na última execução: Kdramas com os mesmos hashes não são reprocessados
+SILVER_STATE_FILENAME = "kdramas_silver_state.json"
+# Incrementar quando a transformação (process_kdrama_data) mudar, para forçar o reprocessamento completo
+SILVER_TRANSFORM_VERSION = 1
+FULL_REFRESH = os.getenv('KDRAMA_SILVER_FULL_REFRESH', "0") == "1"
+
+LIST_COLUMNS = ['genres', 'production_companies', 'networks', 'keywords', 'streaming_br', 'cast_top10', 'directors', 'writers', 'episode_run_time']
 
 # --- Funções Auxiliares ---
 def ensure_dir_exists(directory_path):
@@ -37,8 +47,9 @@ def load_json_file(file_path):
         logging.warning(f"Arquivo JSON não encontrado: {file_path}")
         return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with metrics.timed('parse'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
     except json.JSONDecodeError as e:
         logging.error(f"Erro ao decodificar JSON de {file_path}: {e}")
         return None
@@ -53,16 +64,42 @@ def extract_names_from_list_of_dicts(data_list, key_name='name', max_items=None)
     names = [item.get(key_name) for item in data_list if isinstance(item, dict) and item.get(key_name)]
     return names[:max_items] if max_items else names
 
+def as_list(value):
+    """Normaliza valores de colunas de lista (listas, arrays vindos do Parquet, None/NaN) para list."""
+    if isinstance(value, list):
+        return value
+    if value is None or isinstance(value, (str, float)):
+        return []
+    try:
+        return list(value)
+    except TypeError:
+        return []
+
+def load_kdrama_payloads_from_files(kdrama_id, base_bronze_path):
+    """Carrega (discover_info, details, credits) de um Kdrama no layout antigo de arquivos por ID."""
+    return tuple(
+        load_json_file(os.path.join(base_bronze_path, f"{kdrama_id}_{artifact}.json"))
+        for artifact in bronze_store.ARTIFACTS
+    )
+
+def load_kdrama_payloads_from_store(manifest_entry, store_path):
+    """Carrega (discover_info, details, credits) de um Kdrama a partir da sua entrada no manifesto Bronze."""
+    payloads = []
+    for artifact in bronze_store.ARTIFACTS:
+        object_hash = manifest_entry.get(artifact)
+        if not object_hash:
+            payloads.append(None)
+            continue
+        with metrics.timed('parse'):
+            payloads.append(bronze_store.load_object(object_hash, store_path))
+    return tuple(payloads)
+
 # --- Lógica de Transformação para um Kdrama ---
-def process_kdrama_data(kdrama_id, base_bronze_path):
+def process_kdrama_data(kdrama_id, discover_data, details_data, credits_data):
     """
-    Processa os arquivos JSON de um Kdrama da Camada Bronze e retorna um dicionário com dados limpos.
+    Processa os payloads Bronze (discover_info, details e credits) de um Kdrama e retorna um dicionário com dados limpos.
     """
-    logging.debug(f"Processando Kdrama ID: {kdrama_id}")
-    
-    discover_data = load_json_file(os.path.join(base_bronze_path, f"{kdrama_id}_discover_info.json"))
-    details_data = load_json_file(os.path.join(base_bronze_path, f"{kdrama_id}_details.json"))
-    credits_data = load_json_file(os.path.join(base_bronze_path, f"{kdrama_id}_credits.json"))
+    logging.debug("Processando Kdrama ID: %s", kdrama_id)
 
     # Se o discover_info (principal) não existir, não podemos prosseguir para este ID
     if not discover_data:
@@ -111,9 +148,9 @@ def process_kdrama_data(kdrama_id, base_bronze_path):
         processed_data['vote_average_details'] = details_data.get('vote_average') # Pode ser mais atualizado
         processed_data['vote_count_details'] = details_data.get('vote_count')
         # Palavras-chave
-        keywords_results = details_data.get('keywords', {}).get('results', []) # TMDB v3 para TV
-        if not keywords_results and 'keywords' in details_data: # TMDB v4 pode retornar 'keywords' diretamente
-             keywords_results = details_data.get('keywords', [])
+        keywords = details_data.get('keywords') or {}
+        # TMDB v3 para TV: {'results': [...]}; TMDB v4 pode retornar a lista diretamente
+        keywords_results = keywords.get('results', []) if isinstance(keywords, dict) else keywords
         processed_data['keywords'] = extract_names_from_list_of_dicts(keywords_results)
 
         # Onde assistir (Exemplo simples para 'flatrate' no Brasil)
@@ -150,80 +187,245 @@ def process_kdrama_data(kdrama_id, base_bronze_path):
     return processed_data
 
 
+# --- Processamento incremental ---
+def list_bronze_ids_from_files(base_bronze_path):
+    """Lista os IDs no layout antigo de arquivos ({id}_discover_info.json). Retorna None se o caminho não existir."""
+    if not os.path.exists(base_bronze_path):
+        logging.error(f"Caminho da Camada Bronze não encontrado: {base_bronze_path}. Abortando.")
+        return None
+
+    kdrama_ids = set() # Usar um set para evitar duplicatas de IDs
+    for filename in os.listdir(base_bronze_path):
+        if filename.endswith("_discover_info.json"):
+            # Extrai o ID do nome do arquivo (ex: "12345_discover_info.json" -> "12345")
+            kdrama_id = filename.split('_')[0]
+            if kdrama_id.isdigit(): # Verifica se é um ID numérico válido
+                kdrama_ids.add(kdrama_id)
+            else:
+                logging.warning(f"Não foi possível extrair o ID do arquivo: {filename}")
+    return kdrama_ids
+
+def load_unchanged_silver_rows(fingerprints, kdrama_ids):
+    """
+    Retorna (df_reaproveitado, ids_a_processar, ids_em_quarentena).
+    df_reaproveitado é None quando não há estado anterior compatível (processamento completo).
+    ids_em_quarentena são os IDs que já foram para a quarentena e cujo hash Bronze não mudou: não são revalidados.
+    """
+    import pandas as pd
+
+    state_path = os.path.join(SILVER_DATA_PATH, SILVER_STATE_FILENAME)
+    silver_file_path = os.path.join(SILVER_DATA_PATH, SILVER_OUTPUT_FILENAME)
+    if FULL_REFRESH or fingerprints is None or not os.path.exists(state_path) or not os.path.exists(silver_file_path):
+        return None, sorted(kdrama_ids), set()
+
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('transform_version') != SILVER_TRANSFORM_VERSION:
+            logging.info("Versão da transformação Silver mudou. Reprocessando todos os Kdramas.")
+            return None, sorted(kdrama_ids), set()
+        previous_fingerprints = state.get('fingerprints', {})
+        unchanged_ids = {kdrama_id for kdrama_id in kdrama_ids
+                         if previous_fingerprints.get(kdrama_id) == fingerprints[kdrama_id]}
+        still_quarantined = unchanged_ids & set(state.get('quarantined', []))
+        with metrics.timed('parse'):
+            df_previous = pd.read_parquet(silver_file_path)
+    except Exception as e:
+        logging.warning(f"Estado anterior da Camada Silver ilegível ({e}). Reprocessando todos os Kdramas.")
+        return None, sorted(kdrama_ids), set()
+
+    df_reused = df_previous[df_previous['id_tmdb'].astype(str).isin(unchanged_ids)]
+    accounted_ids = set(df_reused['id_tmdb'].astype(str)) | still_quarantined
+    return df_reused, sorted(kdrama_id for kdrama_id in kdrama_ids if kdrama_id not in accounted_ids), still_quarantined
+
+def save_silver_state(fingerprints, bronze_run_id, quarantined_ids=()):
+    """
+    Grava os hashes Bronze usados nesta execução (apenas quando a Camada Bronze tem manifesto)
+    e os IDs em quarentena, que só voltam a ser validados quando o hash Bronze deles mudar.
+    """
+    state_path = os.path.join(SILVER_DATA_PATH, SILVER_STATE_FILENAME)
+    if fingerprints is None:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return
+    state = {
+        'transform_version': SILVER_TRANSFORM_VERSION,
+        'bronze_run_id': bronze_run_id,
+        'fingerprints': fingerprints,
+        'quarantined': sorted(quarantined_ids),
+    }
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def quarantine_record(quarantine_path, kdrama_id, errors, manifest_entry=None):
+    """Grava os erros de validação de um Kdrama (e os hashes dos payloads, se houver manifesto) na quarentena."""
+    ensure_dir_exists(quarantine_path)
+    record = {'kdrama_id': kdrama_id, 'errors': errors, 'bronze_hashes': manifest_entry}
+    with open(os.path.join(quarantine_path, f"{kdrama_id}.json"), 'w', encoding='utf-8') as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    logging.warning(f"Kdrama ID {kdrama_id} em quarentena: {errors[0]['artifact']} - {errors[0]['message']}")
+
+def save_validation_report(quarantine_path, validator):
+    """Registra as contagens da validação nas métricas e grava o relatório de drift quando houver algo a reportar."""
+    metrics.add_records('kdramas_validados', validator.validated)
+    metrics.add_records('kdramas_quarentena', validator.invalid)
+    metrics.add_records('ocorrencias_drift_schema', sum(validator.drift.values()))
+    if not validator.invalid and not validator.drift:
+        return
+    ensure_dir_exists(quarantine_path)
+    report = {
+        'validated': validator.validated,
+        'quarantined': validator.invalid,
+        'drift': dict(validator.drift.most_common()),
+    }
+    with open(os.path.join(quarantine_path, VALIDATION_REPORT_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logging.info(f"Validação: {validator.validated} Kdramas, {validator.invalid} em quarentena, "
+                 f"{sum(validator.drift.values())} ocorrências de drift de schema. Relatório: {quarantine_path}")
+
+def save_popularity_snapshot(df_silver, bronze_run_id):
+    """Acrescenta o snapshot do dia (popularidade, nota e votos) à série histórica particionada por data."""
+    snapshot_date = timeseries_store.snapshot_date_for_run(bronze_run_id)
+    try:
+        with metrics.timed('snapshot'):
+            snapshot = timeseries_store.build_snapshot(df_silver)
+            file_path = timeseries_store.write_snapshot(snapshot, snapshot_date)
+        metrics.add_records('linhas_snapshot', len(snapshot))
+        logging.info(f"Snapshot de popularidade de {snapshot_date.isoformat()} salvo em: {file_path} ({len(snapshot)} Kdramas)")
+    except Exception as e:
+        logging.error(f"Erro ao salvar o snapshot de popularidade: {e}")
+
+
 # --- Lógica Principal do Pipeline Silver ---
+@metrics.instrumented_stage('silver')
 def run_silver_pipeline():
+    import pandas as pd # Import tardio: só paga o custo do pandas quem executa o pipeline
+
     logging.info("Iniciando pipeline da Camada Silver...")
     ensure_dir_exists(SILVER_DATA_PATH)
 
-    # 1. Listar todos os arquivos de 'discover_info' para obter os IDs
-    kdrama_ids = set() # Usar um set para evitar duplicatas de IDs
-    if not os.path.exists(BRONZE_DATA_PATH):
-        logging.error(f"Caminho da Camada Bronze não encontrado: {BRONZE_DATA_PATH}. Abortando.")
-        return
+    # 1. Obter os IDs (e o conteúdo) da Camada Bronze: pelo manifesto mais recente ou, se não houver, pelos arquivos
+    manifest = bronze_store.load_manifest(store_path=BRONZE_STORE_PATH)
+    if manifest:
+        manifest_entries = {kdrama_id: entry for kdrama_id, entry in manifest['entries'].items() if kdrama_id.isdigit()}
+        fingerprints = {kdrama_id: bronze_store.entry_fingerprint(entry) for kdrama_id, entry in manifest_entries.items()}
+        kdrama_ids = set(manifest_entries)
+        logging.info(f"Lendo a Camada Bronze pelo manifesto {manifest['run_id']}.")
+    else:
+        manifest_entries, fingerprints = None, None
+        kdrama_ids = list_bronze_ids_from_files(BRONZE_DATA_PATH)
+        if kdrama_ids is None:
+            return
 
-    for filename in os.listdir(BRONZE_DATA_PATH):
-        if filename.endswith("_discover_info.json"):
-            try:
-                # Extrai o ID do nome do arquivo (ex: "12345_discover_info.json" -> "12345")
-                kdrama_id = filename.split('_')[0]
-                if kdrama_id.isdigit(): # Verifica se é um ID numérico válido
-                    kdrama_ids.add(kdrama_id)
-            except IndexError:
-                logging.warning(f"Não foi possível extrair o ID do arquivo: {filename}")
-    
     if not kdrama_ids:
         logging.warning("Nenhum Kdrama ID encontrado na Camada Bronze para processar.")
         return
     
-    logging.info(f"Encontrados {len(kdrama_ids)} IDs de Kdramas únicos para processar da Camada Bronze.")
+    logging.info(f"Encontrados {len(kdrama_ids)} IDs de Kdramas únicos na Camada Bronze.")
 
-    # 2. Processar cada Kdrama
+    # IDs cujos hashes Bronze não mudaram desde a última execução reaproveitam as linhas já processadas
+    df_reused, ids_to_process, quarantined_ids = load_unchanged_silver_rows(fingerprints, kdrama_ids)
+    if df_reused is not None:
+        logging.info(f"{len(df_reused)} Kdramas inalterados reaproveitados; {len(quarantined_ids)} inalterados seguem em quarentena; "
+                     f"{len(ids_to_process)} a processar.")
+        metrics.add_records('kdramas_reaproveitados', len(df_reused))
+        if not ids_to_process and len(df_reused) + len(quarantined_ids) == len(kdrama_ids):
+            logging.info("Nenhuma alteração na Camada Bronze desde a última execução. Camada Silver já atualizada.")
+            # Mesmo sem mudanças, a série histórica ganha o ponto do dia
+            save_popularity_snapshot(df_reused, manifest['run_id'])
+            return
+
+    # 2. Validar (JSON Schema compilado, em lotes) e processar cada Kdrama; registros inválidos vão para a quarentena
     all_processed_kdramas = []
-    for kdrama_id in kdrama_ids:
-        processed_data = process_kdrama_data(kdrama_id, BRONZE_DATA_PATH)
-        if processed_data:
-            all_processed_kdramas.append(processed_data)
-            logging.info(f"Kdrama ID {kdrama_id} processado para a Camada Silver.")
-        else:
-            logging.warning(f"Falha ao processar dados para o Kdrama ID {kdrama_id}.")
+    validator = payload_validation.BatchValidator()
+    quarantine_path = os.path.join(SILVER_QUARANTINE_PATH, manifest['run_id'] if manifest else datetime.now().strftime("%Y%m%dT%H%M%S"))
+    progress = ProgressReporter("Kdramas processados para a Camada Silver", total=len(ids_to_process))
+    batch_size = payload_validation.VALIDATION_BATCH_SIZE
+    for batch_start in range(0, len(ids_to_process), batch_size):
+        batch = []
+        for kdrama_id in ids_to_process[batch_start:batch_start + batch_size]:
+            if manifest_entries is not None:
+                payloads = load_kdrama_payloads_from_store(manifest_entries[kdrama_id], BRONZE_STORE_PATH)
+            else:
+                payloads = load_kdrama_payloads_from_files(kdrama_id, BRONZE_DATA_PATH)
+            batch.append((kdrama_id, dict(zip(bronze_store.ARTIFACTS, payloads))))
 
-    if not all_processed_kdramas:
+        with metrics.timed('validate'):
+            invalid = validator.validate(batch)
+        quarantined_ids.update(invalid)
+        for kdrama_id, errors in invalid.items():
+            quarantine_record(quarantine_path, kdrama_id, errors, manifest_entries.get(kdrama_id) if manifest_entries else None)
+
+        for kdrama_id, payloads in batch:
+            if kdrama_id in invalid:
+                progress.update()
+                continue
+            processed_data = process_kdrama_data(kdrama_id, *(payloads[artifact] for artifact in bronze_store.ARTIFACTS))
+            if processed_data:
+                all_processed_kdramas.append(processed_data)
+                metrics.add_records('kdramas')
+                logging.debug("Kdrama ID %s processado para a Camada Silver.", kdrama_id)
+            else:
+                logging.warning(f"Falha ao processar dados para o Kdrama ID {kdrama_id}.")
+            progress.update()
+    progress.finish()
+    save_validation_report(quarantine_path, validator)
+
+    if not all_processed_kdramas and df_reused is None:
         logging.warning("Nenhum Kdrama foi processado com sucesso. Nenhum dado para salvar na Camada Silver.")
         return
 
     # 3. Converter para DataFrame do Pandas
-    df_silver = pd.DataFrame(all_processed_kdramas)
-    logging.info(f"DataFrame da Camada Silver criado com {df_silver.shape[0]} linhas e {df_silver.shape[1]} colunas.")
-    
-    # Algumas limpezas/transformações adicionais no DataFrame completo (opcional)
-    # Ex: garantir que colunas de lista sejam de fato listas e não objetos, tratar NaNs específicos
-    list_columns = ['genres', 'production_companies', 'networks', 'keywords', 'streaming_br', 'cast_top10', 'directors', 'writers', 'episode_run_time']
-    for col in list_columns:
-        if col in df_silver.columns:
-            df_silver[col] = df_silver[col].apply(lambda x: x if isinstance(x, list) else [])
+    with metrics.timed('transform'):
+        frames = [pd.DataFrame(all_processed_kdramas)] if all_processed_kdramas else []
+        if df_reused is not None:
+            frames.insert(0, df_reused)
+        df_silver = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        logging.info(f"DataFrame da Camada Silver criado com {df_silver.shape[0]} linhas e {df_silver.shape[1]} colunas.")
+
+        # Algumas limpezas/transformações adicionais no DataFrame completo (opcional)
+        # Ex: garantir que colunas de lista sejam de fato listas e não objetos, tratar NaNs específicos
+        for col in LIST_COLUMNS:
+            if col in df_silver.columns:
+                df_silver[col] = df_silver[col].apply(as_list)
+
+        # Tipos compactos (categorias, inteiros anuláveis, float32): ver common/schema.py
+        df_silver = schema.apply_schema(df_silver, schema.SILVER_SCHEMA)
     
-    # Verificar tipos de dados e exibir informações do DataFrame
-    logging.info("Informações do DataFrame da Camada Silver (dtypes e amostra):")
-    df_silver.info(verbose=True, show_counts=True) # verbose e show_counts para mais detalhes
-    logging.info("\nAmostra dos dados da Camada Silver (primeiras 5 linhas):")
-    # Para logging, converter para string para evitar problemas com display em alguns terminais
-    try:
-        logging.info("\n" + df_silver.head().to_string())
-    except Exception as e:
-        logging.error(f"Erro ao logar head do DataFrame: {e}")
+    # Verificar tipos de dados e exibir informações do DataFrame (caro em volumes grandes: apenas em DEBUG)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        info_buffer = io.StringIO()
+        df_silver.info(verbose=True, show_counts=True, buf=info_buffer) # verbose e show_counts para mais detalhes
+        logging.debug("Informações do DataFrame da Camada Silver (dtypes):\n" + info_buffer.getvalue())
+        # Para logging, converter para string para evitar problemas com display em alguns terminais
+        try:
+            logging.debug("Amostra dos dados da Camada Silver (primeiras 5 linhas):\n" + df_silver.head().to_string())
+        except Exception as e:
+            logging.error(f"Erro ao logar head do DataFrame: {e}")
 
 
     # 4. Salvar o DataFrame como Parquet na Camada Silver
     silver_file_path = os.path.join(SILVER_DATA_PATH, SILVER_OUTPUT_FILENAME)
     try:
-        df_silver.to_parquet(silver_file_path, index=False, engine='pyarrow') # ou 'fastparquet'
+        with metrics.timed('write'):
+            schema.write_parquet(df_silver, silver_file_path, schema.SILVER_LIST_TYPES)
         logging.info(f"DataFrame da Camada Silver salvo em: {silver_file_path}")
+        save_silver_state(fingerprints, manifest['run_id'] if manifest else None, quarantined_ids)
     except Exception as e:
         logging.error(f"Erro ao salvar DataFrame da Camada Silver como Parquet: {e}")
 
+    # 5. Snapshot diário de popularidade e votos (série histórica usada pelas tendências do Gold)
+    save_popularity_snapshot(df_silver, manifest['run_id'] if manifest else None)
+
     logging.info("Pipeline da Camada Silver finalizado.")
 
 if __name__ == '__main__':
     # Exemplo de execução (da raiz do projeto kdrama_analytics_project/):
     # python src/pipelines/silver.py
+
+    # Configuração de logging (handler não bloqueante; nível e formato via KDRAMA_LOG_LEVEL / KDRAMA_LOG_FORMAT)
+    setup_logging()
     run_silver_pipeline()
\ No newline at end of file
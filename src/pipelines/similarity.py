@@ -0,0 +1,78 @@
+import os
+import logging
+
+from common import metrics
+from common.schema import SIMILAR_KDRAMAS_SCHEMA, apply_schema
+from common.sparse_features import incidence_matrix, tfidf_weight, normalize_rows, blocked_top_k
+
+# Tabela Gold "Kdramas parecidos": para cada Kdrama, os TOP_K mais similares pelo conteúdo.
+#
+# Cada coluna de lista da Silver vira uma matriz esparsa TF-IDF (um termo por gênero, palavra-chave,
+# emissora ou pessoa), normalizada por linha e multiplicada pela raiz do peso do grupo. As matrizes são
+# concatenadas e normalizadas de novo, de modo que o produto interno entre duas linhas é a similaridade
+# do cosseno ponderada. Os vizinhos vêm de produtos em blocos (common/sparse_features.blocked_top_k).
+
+SIMILAR_KDRAMAS_FILENAME = "similar_kdramas.parquet"
+TOP_K = int(os.getenv('KDRAMA_SIMILAR_TOP_K', "10"))
+MIN_SIMILARITY = 0.05
+
+# Peso de cada grupo de atributos na similaridade
+FEATURE_WEIGHTS = {
+    'genres': 1.0,
+    'keywords': 1.5,
+    'networks': 0.5,
+    'directors': 1.0,
+    'writers': 1.0,
+    'cast_top10': 1.0,
+}
+# Termos que aparecem em um único Kdrama não aproximam ninguém: ficam fora da matriz
+MIN_DOC_FREQ = 2
+
+
+def build_feature_matrix(df_silver, feature_weights=FEATURE_WEIGHTS, min_df=MIN_DOC_FREQ):
+    """Matriz esparsa (Kdramas × atributos) com os grupos TF-IDF ponderados e linhas normalizadas."""
+    import numpy as np
+    from scipy import sparse
+
+    blocks = []
+    for column, weight in feature_weights.items():
+        if column not in df_silver.columns:
+            logging.warning(f"Coluna '{column}' ausente na Silver. Ignorada na similaridade.")
+            continue
+        matrix, terms = incidence_matrix(df_silver[column], min_df=min_df)
+        if len(terms) == 0:
+            continue
+        blocks.append(tfidf_weight(matrix) * np.float32(np.sqrt(weight)))
+        logging.debug("Similaridade: %d termos em '%s'.", len(terms), column)
+
+    if not blocks:
+        return sparse.csr_matrix((len(df_silver), 0), dtype=np.float32)
+    return normalize_rows(sparse.hstack(blocks, format='csr'))
+
+
+def build_similar_kdramas(df_silver, k=TOP_K, min_similarity=MIN_SIMILARITY):
+    """
+    Retorna um DataFrame no formato longo (id_tmdb, rank, similar_id_tmdb, similar_title_ptbr, similarity),
+    pronto para o dashboard filtrar por id_tmdb.
+    """
+    import pandas as pd
+
+    df_silver = df_silver.reset_index(drop=True)
+    features = build_feature_matrix(df_silver)
+    metrics.add_records('atributos_similaridade', features.shape[1])
+    logging.info(f"Matriz de atributos para similaridade: {features.shape[0]} Kdramas × {features.shape[1]} atributos "
+                 f"({features.nnz} valores não nulos).")
+
+    rows, neighbors, scores = blocked_top_k(features, k, min_score=min_similarity)
+
+    ids = df_silver['id_tmdb'].to_numpy()
+    df_similar = pd.DataFrame({
+        'id_tmdb': ids[rows],
+        'similar_id_tmdb': ids[neighbors],
+        'similarity': scores.round(4),
+    })
+    if 'title_ptbr' in df_silver.columns:
+        df_similar['similar_title_ptbr'] = df_silver['title_ptbr'].to_numpy()[neighbors]
+    # Posição do vizinho (1 = mais parecido); as linhas já vêm em ordem decrescente de similaridade
+    df_similar.insert(1, 'rank', df_similar.groupby('id_tmdb').cumcount() + 1)
+    return apply_schema(df_similar, SIMILAR_KDRAMAS_SCHEMA)
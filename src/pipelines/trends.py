@@ -0,0 +1,173 @@
+import os
+import json
+import logging
+from datetime import timedelta
+
+from common import metrics
+from common import timeseries_store
+
+# Tabelas Gold de tendência de popularidade e votos, a partir da série histórica da Silver
+# (common/timeseries_store.py, uma partição Parquet por dia).
+#
+#   popularidade_mensal.parquet     rollup por (id_tmdb, mês): primeiro/último/mín/máx/média e votos no fim do mês
+#   tendencia_popularidade.parquet  valor atual e variações de 7 e 30 dias de cada Kdrama
+#   kdramas_em_alta.parquet         Kdramas com maior alta de popularidade em 7 dias
+#
+# Nada aqui relê a série inteira: o rollup mensal recalcula apenas os meses com partições novas ou
+# regravadas desde a última execução (controle em tendencias_estado.json), e as variações leem só
+# as partições de hoje, de 7 e de 30 dias atrás. Consultas sobre meses de histórico usam o rollup.
+
+MONTHLY_ROLLUP_FILENAME = "popularidade_mensal.parquet"
+TRENDS_FILENAME = "tendencia_popularidade.parquet"
+RISING_FILENAME = "kdramas_em_alta.parquet"
+TRENDS_STATE_FILENAME = "tendencias_estado.json"
+
+DELTA_WINDOWS_DAYS = (7, 30)
+# Snapshot de referência aceito para uma janela de N dias: entre N e N * fator dias antes do mais recente.
+# Depois de uma lacuna maior nas execuções a variação fica NaN (comparar com meses atrás rotularia errado a janela)
+MAX_REFERENCE_WINDOW_FACTOR = 1.5
+TOP_RISING = 20
+
+
+def _load_state(gold_path):
+    state_path = os.path.join(gold_path, TRENDS_STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Estado das tendências ilegível ({e}). O rollup mensal será recalculado.")
+        return {}
+
+
+def _save_state(gold_path, state):
+    state_path = os.path.join(gold_path, TRENDS_STATE_FILENAME)
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def _monthly_aggregates(df_snapshots):
+    """Rollup por (id_tmdb, mês) de um conjunto de snapshots que contém os meses inteiros."""
+    df_snapshots = df_snapshots.sort_values(['id_tmdb', 'snapshot_date'])
+    df_snapshots['month'] = df_snapshots['snapshot_date'].dt.to_period('M').dt.to_timestamp()
+    grouped = df_snapshots.groupby(['id_tmdb', 'month'], sort=False)
+    df_monthly = grouped.agg(
+        snapshots=('popularity', 'size'),
+        popularity_first=('popularity', 'first'),
+        popularity_last=('popularity', 'last'),
+        popularity_min=('popularity', 'min'),
+        popularity_max=('popularity', 'max'),
+        popularity_mean=('popularity', 'mean'),
+        vote_average_last=('vote_average', 'last'),
+        vote_count_last=('vote_count', 'last'),
+        last_snapshot_date=('snapshot_date', 'max'),
+    ).reset_index()
+    df_monthly['popularity_change'] = df_monthly['popularity_last'] - df_monthly['popularity_first']
+    return df_monthly
+
+
+def update_monthly_rollup(gold_path, dates, store_path=timeseries_store.TIMESERIES_STORE_PATH):
+    """
+    Atualiza o rollup mensal incrementalmente. Retorna (DataFrame do rollup ou None se nada mudou, partições vistas).
+    Só os meses com partições novas ou regravadas (mtime diferente do registrado) são recalculados,
+    lendo apenas as partições desses meses; os demais meses vêm do rollup anterior.
+    """
+    import pandas as pd
+
+    rollup_path = os.path.join(gold_path, MONTHLY_ROLLUP_FILENAME)
+    seen = _load_state(gold_path).get('partitions', {}) if os.path.exists(rollup_path) else {}
+    current = {d.isoformat(): timeseries_store.partition_mtime(d, store_path) for d in dates}
+    changed_months = {d[:7] for d, mtime in current.items() if seen.get(d) != mtime}
+    if not changed_months:
+        logging.info("Série histórica sem partições novas. Rollup mensal mantido.")
+        return None, current
+
+    month_dates = [d for d in dates if d.isoformat()[:7] in changed_months]
+    logging.info(f"Recalculando o rollup de {len(changed_months)} mês(es) a partir de {len(month_dates)} partições "
+                 f"(de {len(dates)} no total).")
+    df_snapshots = timeseries_store.read_snapshots(month_dates, store_path)
+    metrics.add_records('linhas_snapshot_lidas', len(df_snapshots))
+    df_rollup = _monthly_aggregates(df_snapshots)
+
+    if seen:
+        df_previous = pd.read_parquet(rollup_path)
+        keep = ~df_previous['month'].dt.strftime('%Y-%m').isin(changed_months)
+        # Frames vazios ficam fora do concat (o pandas avisa que deixarão de contar na inferência dos tipos)
+        frames = [frame for frame in (df_previous[keep], df_rollup) if not frame.empty]
+        if frames:
+            df_rollup = pd.concat(frames, ignore_index=True)
+    return df_rollup.sort_values(['month', 'id_tmdb'], ignore_index=True), current
+
+
+def compute_deltas(dates, store_path=timeseries_store.TIMESERIES_STORE_PATH, windows=DELTA_WINDOWS_DAYS):
+    """
+    Valor mais recente de cada Kdrama e variações em relação ao snapshot mais recente de N dias antes ou mais
+    (até N * MAX_REFERENCE_WINDOW_FACTOR). Lê apenas 1 + len(windows) partições.
+    """
+    import pandas as pd
+
+    latest = dates[-1]
+    df_trends = timeseries_store.read_snapshots([latest], store_path).drop(columns='snapshot_date')
+    for window in windows:
+        suffix = f"_{window}d"
+        reference_date = timeseries_store.latest_date_on_or_before(
+            dates, latest - timedelta(days=window), not_before=latest - timedelta(days=window * MAX_REFERENCE_WINDOW_FACTOR))
+        if reference_date is None: # Histórico mais curto que a janela ou lacuna longa demais nas execuções
+            if dates[0] <= latest - timedelta(days=window):
+                logging.info(f"Nenhum snapshot entre {window} e {window * MAX_REFERENCE_WINDOW_FACTOR:g} dias antes de {latest}. "
+                             f"Variações de {window} dias ficam vazias.")
+            # float32 como nas janelas calculadas (mesmo tipo por coluna, qualquer que seja a janela)
+            df_trends[f'popularity_delta{suffix}'] = pd.Series(float('nan'), index=df_trends.index, dtype='float32')
+            df_trends[f'popularity_pct{suffix}'] = pd.Series(float('nan'), index=df_trends.index, dtype='float32')
+            df_trends[f'vote_count_delta{suffix}'] = pd.array([pd.NA] * len(df_trends), dtype='Int32')
+            df_trends[f'reference_date{suffix}'] = None
+            continue
+        df_reference = timeseries_store.read_snapshots([reference_date], store_path, columns=['id_tmdb', 'popularity', 'vote_count'])
+        merged = df_trends[['id_tmdb']].merge(df_reference, on='id_tmdb', how='left')
+        df_trends[f'popularity_delta{suffix}'] = (df_trends['popularity'] - merged['popularity']).round(3)
+        # Popularidade anterior 0: variação percentual indefinida (NaN em vez de inf)
+        reference_popularity = merged['popularity'].where(merged['popularity'] != 0)
+        df_trends[f'popularity_pct{suffix}'] = ((df_trends['popularity'] / reference_popularity - 1) * 100).round(2)
+        df_trends[f'vote_count_delta{suffix}'] = df_trends['vote_count'] - merged['vote_count']
+        df_trends[f'reference_date{suffix}'] = reference_date.isoformat()
+
+    df_trends.insert(1, 'snapshot_date', latest.isoformat())
+    return df_trends
+
+
+def build_trend_tables(df_silver, gold_path, store_path=timeseries_store.TIMESERIES_STORE_PATH):
+    """
+    Retorna ({nome do arquivo: DataFrame}, estado). O estado deve ser gravado com save_trends_state
+    depois que as tabelas forem salvas (senão a próxima execução acharia que o rollup está em dia).
+    """
+    dates = timeseries_store.list_snapshot_dates(store_path)
+    if not dates:
+        logging.warning("Série histórica de popularidade vazia. Tendências não geradas.")
+        return {}, None
+
+    tables = {}
+    df_rollup, partitions = update_monthly_rollup(gold_path, dates, store_path)
+    if df_rollup is not None:
+        tables[MONTHLY_ROLLUP_FILENAME] = df_rollup
+
+    df_trends = compute_deltas(dates, store_path)
+    if 'title_ptbr' in df_silver.columns:
+        titles = df_silver[['id_tmdb', 'title_ptbr']].drop_duplicates('id_tmdb')
+        titles = titles.astype({'id_tmdb': df_trends['id_tmdb'].dtype})
+        df_trends = df_trends.merge(titles, on='id_tmdb', how='left')
+    tables[TRENDS_FILENAME] = df_trends
+
+    # Em alta: maior ganho absoluto de popularidade na menor janela (só quem subiu). Sempre gerada,
+    # mesmo vazia, para substituir a lista da execução anterior
+    delta_column = f'popularity_delta_{DELTA_WINDOWS_DAYS[0]}d'
+    df_rising = df_trends[df_trends[delta_column] > 0].nlargest(TOP_RISING, delta_column)
+    tables[RISING_FILENAME] = df_rising.reset_index(drop=True)
+    return tables, {'partitions': partitions, 'latest_snapshot_date': dates[-1].isoformat()}
+
+
+def save_trends_state(gold_path, state):
+    if state is not None:
+        _save_state(gold_path, state)